@@ -96,7 +96,7 @@ class Monitor:
     def update(self, x):
         from .lib import fill_at
 
-        fill_at(self.id, x)
+        fill_at(self.id, x, patch=True)
 
     def __hrepr__(self, H, hrepr):
         return H.div(id=self.id)
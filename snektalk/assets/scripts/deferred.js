@@ -0,0 +1,163 @@
+
+require.config({ paths: { "vs": "/lib/vs" }});
+define(["vs/editor/editor.main"], (monaco) => {
+
+    // Must match the line height of the Monaco editors
+    const LINE_HEIGHT = 19;
+
+    const observers = new Map();
+
+    function getObservers(root) {
+        // One pair of observers per scrolling container: editors are created
+        // when they come near the viewport, and released when they go far
+        // from it
+        if (!observers.has(root)) {
+            let near = new IntersectionObserver(
+                entries => {
+                    for (let entry of entries) {
+                        if (entry.isIntersecting) {
+                            entry.target.$$deferred.upgrade();
+                        }
+                    }
+                },
+                {root: root, rootMargin: "200px 0px"}
+            );
+            let far = new IntersectionObserver(
+                entries => {
+                    for (let entry of entries) {
+                        if (!entry.isIntersecting) {
+                            entry.target.$$deferred.release();
+                        }
+                    }
+                },
+                {root: root, rootMargin: "5000px 0px"}
+            );
+            observers.set(root, {near, far});
+        }
+        return observers.get(root);
+    }
+
+    class DeferredEditor {
+        // Display code in a container as static highlighted HTML, and only
+        // create a Monaco editor when the container comes into view or gets
+        // the focus. The editor is disposed of when the container goes far
+        // off-screen and idle() is true, and its value is kept.
+        //
+        // create(container, value) must create and return the editor.
+        constructor(container, options) {
+            this.container = container;
+            this.create = options.create;
+            this.idle = options.idle || (() => true);
+            this.language = options.language || "python";
+            this.value = options.value || "";
+            this.highlight = options.highlight ?? null;
+            this.editor = null;
+            this.version = 0;
+
+            container.$$deferred = this;
+            container.tabIndex = 0;
+            container.addEventListener("focus", () => this.focus());
+            container.addEventListener("mousedown", () => this.upgrade());
+            this.renderStatic();
+
+            let root = container.closest(".snek-outer-pane");
+            this.observers = getObservers(root);
+            this.observers.near.observe(container);
+            this.observers.far.observe(container);
+        }
+
+        getValue() {
+            return this.editor ? this.editor.getValue() : this.value;
+        }
+
+        setValue(value, highlight = null) {
+            this.value = value;
+            this.highlight = highlight;
+            if (this.editor) {
+                this.editor.setValue(value);
+            }
+            else {
+                this.renderStatic();
+            }
+        }
+
+        async renderStatic() {
+            let version = ++this.version;
+            let html = await monaco.editor.colorize(this.value, this.language);
+            if (this.editor || version !== this.version) {
+                return;
+            }
+            // Each line is followed by a <br/>
+            let nlines = this.value.split("\n").length;
+            let lines = html.split(/<br\/?>/).slice(0, nlines);
+            let pre = document.createElement("pre");
+            pre.className = "snek-deferred";
+            pre.innerHTML = lines.map(
+                (line, i) => (
+                    i === this.highlight
+                    ? `<div class="snek-bedit-hl">${line}</div>`
+                    : `<div>${line}</div>`
+                )
+            ).join("");
+            this.container.innerHTML = "";
+            this.container.appendChild(pre);
+            this.container.classList.add("snek-deferred-static");
+            if (this.highlight !== null) {
+                this.container.scrollTop = (
+                    (this.highlight + 0.5) * LINE_HEIGHT
+                    - this.container.clientHeight / 2
+                );
+            }
+        }
+
+        upgrade() {
+            if (this.editor) {
+                return this.editor;
+            }
+            let scroll = this.container.scrollTop;
+            this.version++;
+            this.container.innerHTML = "";
+            this.container.classList.remove("snek-deferred-static");
+            this.container.tabIndex = -1;
+            this.editor = this.create(this.container, this.value);
+            if (this.highlight === null) {
+                this.editor.setScrollTop(scroll);
+            }
+            return this.editor;
+        }
+
+        release() {
+            if (!this.editor || this.editor.hasTextFocus() || !this.idle()) {
+                return;
+            }
+            this.value = this.editor.getValue();
+            this.editor.getModel().dispose();
+            this.editor.dispose();
+            this.editor = null;
+            this.container.tabIndex = 0;
+            this.renderStatic();
+        }
+
+        dispose() {
+            this.observers.near.unobserve(this.container);
+            this.observers.far.unobserve(this.container);
+            if (this.editor) {
+                this.editor.getModel().dispose();
+                this.editor.dispose();
+                this.editor = null;
+            }
+        }
+
+        // Interface used to cycle between editors
+
+        focus() {
+            this.upgrade().focus();
+        }
+
+        hasTextFocus() {
+            return this.editor !== null && this.editor.hasTextFocus();
+        }
+    }
+
+    return DeferredEditor;
+});
@@ -0,0 +1,128 @@
+
+define([], () => {
+
+    function hue(text) {
+        let h = 0;
+        for (let i = 0; i < text.length; i++) {
+            h = (h * 31 + text.charCodeAt(i)) % 360;
+        }
+        return h;
+    }
+
+    function formatTime(t, unit) {
+        if (unit !== "s") {
+            return `${t} ${unit}`;
+        }
+        else if (t >= 1) {
+            return `${t.toFixed(2)}s`;
+        }
+        else {
+            return `${(t * 1000).toFixed(2)}ms`;
+        }
+    }
+
+    class Flamegraph {
+        constructor(element, options) {
+            this.element = element;
+            this.options = options;
+            this.element.className = "snek-flamegraph";
+
+            this.header = document.createElement("div");
+            this.header.className = "snek-flame-header";
+            this.body = document.createElement("div");
+            this.element.appendChild(this.header);
+            this.element.appendChild(this.body);
+
+            this.update(options.tree);
+        }
+
+        update(tree) {
+            this.tree = tree;
+            this.zoom(tree);
+        }
+
+        zoom(root) {
+            this.root = root;
+            this.total = root.time || 1;
+            this.renderHeader();
+            this.body.innerHTML = "";
+            this.body.appendChild(this.makeNode(root, root.time || 1));
+        }
+
+        renderHeader() {
+            this.header.innerHTML = "";
+
+            let title = document.createElement("span");
+            title.className = "snek-flame-title";
+            title.innerText = `${this.root.name} -- ${formatTime(this.root.time, this.options.unit)}`;
+            this.header.appendChild(title);
+
+            if (this.root !== this.tree) {
+                let reset = document.createElement("span");
+                reset.className = "snek-flame-button";
+                reset.innerText = "reset zoom";
+                reset.onclick = evt => {
+                    evt.stopPropagation();
+                    this.zoom(this.tree);
+                }
+                this.header.appendChild(reset);
+            }
+
+            for (let format of this.options.exports) {
+                let button = document.createElement("span");
+                button.className = "snek-flame-button";
+                button.innerText = format;
+                button.onclick = async evt => {
+                    evt.stopPropagation();
+                    let path = await this.options.py.export(format);
+                    button.innerText = `${format}: ${path}`;
+                }
+                this.header.appendChild(button);
+            }
+        }
+
+        makeNode(node, parentTime) {
+            let box = document.createElement("div");
+            box.className = "snek-flame-node";
+            box.style.width = `${100 * node.time / parentTime}%`;
+
+            let pct = (100 * node.time / this.total).toFixed(1);
+            let label = document.createElement("div");
+            label.className = "snek-flame-label";
+            if (node.editable) {
+                label.classList.add("snek-flame-editable");
+            }
+            label.style.background = `hsl(${hue(node.location || node.name)}, 60%, 75%)`;
+            label.innerText = node.name;
+            label.title = [
+                node.name,
+                node.location,
+                `${formatTime(node.time, this.options.unit)} (${pct}%)`,
+                node.editable ? "click to edit, alt+click to zoom" : "alt+click to zoom",
+            ].filter(x => x).join("\n");
+            label.onclick = evt => {
+                evt.stopPropagation();
+                if (evt.altKey) {
+                    this.zoom(node);
+                }
+                else if (node.editable) {
+                    this.options.py.edit(node.id);
+                }
+            }
+            box.appendChild(label);
+
+            if (node.children.length) {
+                let children = document.createElement("div");
+                children.className = "snek-flame-children";
+                for (let child of node.children) {
+                    children.appendChild(this.makeNode(child, node.time || 1));
+                }
+                box.appendChild(children);
+            }
+
+            return box;
+        }
+    }
+
+    return Flamegraph;
+});
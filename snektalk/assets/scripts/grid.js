@@ -0,0 +1,206 @@
+
+define([], () => {
+
+    // Browsers cap the height of elements, so very long grids scroll
+    // through a spacer of at most this height
+    const MAX_HEIGHT = 1000000;
+
+    class Grid {
+        constructor(element, options) {
+            this.element = element;
+            this.options = options;
+            this.rowHeight = 22;
+            this.nrows = options.nrows;
+            this.block = options.block;
+            this.blocks = new Map();
+            this.pending = new Map();
+            this.version = 0;
+            this.sort = null;
+            this.ascending = true;
+            this.scheduled = false;
+            this.timer = null;
+
+            this.setupElement();
+            this.addBlock(options.initial, this.version);
+            this.resize();
+        }
+
+        setupElement() {
+            this.element.className = "snek-grid";
+            this.element.onclick = evt => evt.stopPropagation();
+            let ncols = this.options.columns.length;
+            this.template = `80px repeat(${ncols}, 120px)`;
+
+            let toolbar = document.createElement("div");
+            toolbar.className = "snek-grid-toolbar";
+            this.filter = document.createElement("input");
+            this.filter.placeholder = "filter";
+            this.filter.oninput = () => {
+                clearTimeout(this.timer);
+                this.timer = setTimeout(() => this.query(), 300);
+            };
+            this.count = document.createElement("span");
+            toolbar.appendChild(this.filter);
+            toolbar.appendChild(this.count);
+
+            this.header = document.createElement("div");
+            this.header.className = "snek-grid-row snek-grid-header";
+            this.header.style.gridTemplateColumns = this.template;
+            this.header.appendChild(document.createElement("div"));
+            this.options.columns.forEach((name, j) => {
+                let cell = document.createElement("div");
+                cell.innerText = name;
+                cell.title = `${name} ${this.options.dtypes[j]}`.trim();
+                cell.onclick = () => {
+                    this.ascending = this.sort === j ? !this.ascending : true;
+                    this.sort = j;
+                    this.query();
+                };
+                this.header.appendChild(cell);
+            });
+
+            this.viewport = document.createElement("div");
+            this.viewport.className = "snek-grid-viewport";
+            this.viewport.onscroll = () => {
+                this.header.style.transform = `translateX(${-this.viewport.scrollLeft}px)`;
+                this.schedule();
+            };
+            this.spacer = document.createElement("div");
+            this.spacer.className = "snek-grid-spacer";
+            this.rows = document.createElement("div");
+            this.rows.className = "snek-grid-rows";
+            this.viewport.appendChild(this.spacer);
+            this.viewport.appendChild(this.rows);
+
+            let headerBox = document.createElement("div");
+            headerBox.className = "snek-grid-header-box";
+            headerBox.appendChild(this.header);
+
+            this.element.appendChild(toolbar);
+            this.element.appendChild(headerBox);
+            this.element.appendChild(this.viewport);
+        }
+
+        resize() {
+            let width = 80 + 120 * this.options.columns.length;
+            let full = this.nrows * this.rowHeight;
+            this.spacer.style.height = `${Math.min(full, MAX_HEIGHT)}px`;
+            this.spacer.style.width = `${width}px`;
+            this.rows.style.width = `${width}px`;
+            this.count.innerText = `${this.nrows} rows`;
+            this.schedule();
+        }
+
+        schedule() {
+            if (!this.scheduled) {
+                this.scheduled = true;
+                requestAnimationFrame(() => {
+                    this.scheduled = false;
+                    this.render();
+                });
+            }
+        }
+
+        firstVisible() {
+            let full = this.nrows * this.rowHeight;
+            let height = Math.min(full, MAX_HEIGHT);
+            let view = this.viewport.clientHeight;
+            let top = this.viewport.scrollTop;
+            if (full > height && height > view) {
+                // Map the scroll position onto the full height
+                top = top * (full - view) / (height - view);
+            }
+            return Math.floor(top / this.rowHeight);
+        }
+
+        render() {
+            let first = this.firstVisible();
+            let count = Math.ceil(this.viewport.clientHeight / this.rowHeight) + 1;
+            let last = Math.min(this.nrows, first + count);
+
+            this.rows.innerHTML = "";
+            this.rows.style.top = `${this.viewport.scrollTop}px`;
+            for (let i = first; i < last; i++) {
+                this.rows.appendChild(this.makeRow(i));
+            }
+        }
+
+        makeRow(i) {
+            let row = document.createElement("div");
+            row.className = "snek-grid-row";
+            row.style.gridTemplateColumns = this.template;
+            row.style.height = `${this.rowHeight}px`;
+            let block = this.getBlock(Math.floor(i / this.block));
+            if (block === null) {
+                row.classList.add("snek-grid-loading");
+                return row;
+            }
+            let k = i - block.start;
+            let label = document.createElement("div");
+            label.className = "snek-grid-index";
+            label.innerText = block.index[k];
+            row.appendChild(label);
+            for (let column of block.columns) {
+                let cell = document.createElement("div");
+                let value = column[k];
+                if (value === null) {
+                    cell.className = "snek-grid-null";
+                    cell.innerText = "None";
+                }
+                else {
+                    cell.innerText = value;
+                    if (typeof value === "number") {
+                        cell.className = "snek-grid-number";
+                    }
+                }
+                cell.title = cell.innerText;
+                row.appendChild(cell);
+            }
+            return row;
+        }
+
+        addBlock(data, version) {
+            if (version === this.version) {
+                this.blocks.set(Math.floor(data.start / this.block), data);
+            }
+        }
+
+        getBlock(b) {
+            if (this.blocks.has(b)) {
+                return this.blocks.get(b);
+            }
+            if (!this.pending.has(b)) {
+                let version = this.version;
+                let start = b * this.block;
+                let prom = this.options.py.window(start, start + this.block);
+                this.pending.set(b, prom);
+                prom.then(data => {
+                    if (version === this.version) {
+                        this.pending.delete(b);
+                        this.addBlock(data, version);
+                        this.schedule();
+                    }
+                });
+            }
+            return null;
+        }
+
+        async query() {
+            let version = ++this.version;
+            this.blocks.clear();
+            this.pending.clear();
+            for (let [j, cell] of Array.from(this.header.children).slice(1).entries()) {
+                cell.classList.toggle("snek-grid-sort-asc", j === this.sort && this.ascending);
+                cell.classList.toggle("snek-grid-sort-desc", j === this.sort && !this.ascending);
+            }
+            let nrows = await this.options.py.query(this.sort, this.ascending, this.filter.value);
+            if (version === this.version) {
+                this.nrows = nrows;
+                this.viewport.scrollTop = 0;
+                this.resize();
+            }
+        }
+    }
+
+    return Grid;
+});
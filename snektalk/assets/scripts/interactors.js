@@ -0,0 +1,145 @@
+
+define([], () => {
+
+    function revive(value) {
+        // Python functions are sent as {"$$SKTK": id}, and non-finite
+        // floats as {"$$float": "NaN"}, since JSON cannot represent them
+        if (Array.isArray(value)) {
+            return value.map(revive);
+        }
+        else if (value !== null && typeof value === "object") {
+            if (value.$$SKTK !== undefined) {
+                return window.$$SKTK(value.$$SKTK);
+            }
+            if (value.$$float !== undefined) {
+                return Number(value.$$float);
+            }
+            for (let key in value) {
+                value[key] = revive(value[key]);
+            }
+        }
+        return value;
+    }
+
+    class InteractorRegistry {
+        // Create Interactor instances from the descriptors in their
+        // element's interactor attribute, which hold the name of the
+        // constructor, the parameters and the id of the instance.
+        //
+        // Instances are kept as weak references, which are removed once
+        // the instances are collected. Calls to an instance that does not
+        // exist yet wait for it, for at most timeout milliseconds.
+        constructor(timeout = 60000) {
+            this.timeout = timeout;
+            this.instances = new Map();
+            this.waiting = new Map();
+            this.finalizer = new FinalizationRegistry(id => {
+                let ref = this.instances.get(id);
+                if (ref && ref.deref() === undefined) {
+                    this.instances.delete(id);
+                }
+            });
+        }
+
+        activate(node) {
+            for (let elem of node.querySelectorAll("[interactor]")) {
+                // One bad descriptor must not prevent the others from
+                // being activated
+                let descr = null;
+                try {
+                    descr = JSON.parse(elem.getAttribute("interactor"));
+                    // The constructor is a module defined by the resources
+                    // of the result, and require calls back asynchronously,
+                    // once elem is in the document
+                    require(
+                        [descr.ctor],
+                        ctor => {
+                            try {
+                                this.create(elem, ctor, descr);
+                            }
+                            catch (exc) {
+                                this.fail(elem, descr, exc);
+                            }
+                        },
+                        exc => this.fail(elem, descr, exc)
+                    );
+                }
+                catch (exc) {
+                    this.fail(elem, descr, exc);
+                }
+            }
+        }
+
+        create(elem, ctor, descr) {
+            let existing = document.getElementById(descr.id);
+            if (existing && existing.handler) {
+                // Move the existing element
+                elem.replaceWith(existing);
+                return;
+            }
+            // This must not run in an event handler, otherwise $$SKTK
+            // would call the functions instead of returning them
+            let params = revive(descr.params);
+            elem.id = descr.id;
+            let obj = new ctor(elem, params);
+            elem.handler = obj;
+            let ref = new WeakRef(obj);
+            this.instances.set(descr.id, ref);
+            this.finalizer.register(obj, descr.id);
+            this.settle(descr.id, ref, null);
+        }
+
+        fail(elem, descr, exc) {
+            console.error("Could not create interactor", descr, exc);
+            elem.innerText = `Could not create interactor: ${exc}`;
+            elem.className = "hrepr-error";
+            if (descr && descr.id) {
+                this.settle(descr.id, null, exc);
+            }
+        }
+
+        wait(id) {
+            if (!this.waiting.has(id)) {
+                let waiter = {};
+                waiter.promise = new Promise((resolve, reject) => {
+                    waiter.resolve = resolve;
+                    waiter.reject = reject;
+                });
+                waiter.timer = setTimeout(
+                    () => this.settle(
+                        id, null, new Error(`Interactor ${id} was not created`)
+                    ),
+                    this.timeout
+                );
+                this.waiting.set(id, waiter);
+            }
+            return this.waiting.get(id).promise;
+        }
+
+        settle(id, ref, error) {
+            let waiter = this.waiting.get(id);
+            if (waiter) {
+                clearTimeout(waiter.timer);
+                this.waiting.delete(id);
+                if (error) {
+                    waiter.reject(error);
+                }
+                else {
+                    waiter.resolve(ref);
+                }
+            }
+        }
+
+        async call(id, method, args) {
+            // Wait for the instance, in case the call arrives before it is
+            // created
+            let ref = this.instances.get(id) || await this.wait(id);
+            let obj = ref.deref();
+            if (obj !== undefined) {
+                return obj[method](...args);
+            }
+        }
+    }
+
+    return InteractorRegistry;
+});
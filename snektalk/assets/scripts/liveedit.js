@@ -1,6 +1,8 @@
 
 require.config({ paths: { 'vs': '/lib/vs' }});
-define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
+define(
+    ["vs/editor/editor.main", "scripts/repl", "scripts/deferred"],
+    (monaco, repl, DeferredEditor) => {
     const KM = monaco.KeyMod;
     const KC = monaco.KeyCode;
 
@@ -15,14 +17,19 @@ define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
             this.inferStatus();
 
             if (this.options.autofocus) {
-                this.editor.focus();
+                this.deferred.focus();
             }
         }
 
+        get editor() {
+            return this.deferred.editor;
+        }
+
         setupElement() {
             let container = document.createElement("div");
             container.className = "snek-bedit-editor snek-editor-cyclable"
             container.onclick = _ => {}
+            container.style.maxHeight = `${this.options.max_height || 500}px`;
             this.container = container
 
             let status = document.createElement("div");
@@ -45,7 +52,7 @@ define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
         }
 
         inferStatus() {
-            let curr = this.editor.getValue();
+            let curr = this.deferred.getValue();
             if (curr === this.content.live) {
                 if (curr === this.content.saved) {
                     this.setStatus("saved");
@@ -79,7 +86,7 @@ define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
         async save(commit) {
             try {
                 let method = commit ? "commit" : "save";
-                let value = this.editor.getValue()
+                let value = this.deferred.getValue()
                 let response = await this.options.py[method](value);
                 this.content.live = value
                 if (commit) {
@@ -100,8 +107,24 @@ define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
         }
 
         setupEditor() {
-            this.editor = monaco.editor.create(this.container, {
+            // The Monaco editor is only created when the container comes
+            // into view or is focused
+            this.deferred = new DeferredEditor(this.container, {
                 value: this.content.live,
+                create: this.createEditor.bind(this),
+                highlight: this.options.highlight,
+                idle: () => this.status !== "dirty",
+            });
+            this.container.$editor = this.deferred;
+        }
+
+        suspend() {
+            this.deferred.release();
+        }
+
+        createEditor(container, value) {
+            let editor = monaco.editor.create(container, {
+                value: value,
                 language: 'python',
                 lineNumbers: false,
                 minimap: {enabled: false},
@@ -110,45 +133,45 @@ define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
                 folding: false,
                 automaticLayout: true,
             });
-            this.container.$editor = this.editor;
-
-            this.editor.onDidContentSizeChange(this.event_updateHeight.bind(this));
-            this.event_updateHeight();
+            editor.onDidContentSizeChange(() => this.event_updateHeight(editor));
+            this.event_updateHeight(editor);
 
-            this.editor.addCommand(
+            editor.addCommand(
                 KM.CtrlCmd | KC.KEY_S,
                 this.command_save.bind(this)
             );
-            this.editor.addCommand(
+            editor.addCommand(
                 KM.CtrlCmd | KM.Shift | KC.KEY_S,
                 this.command_commit.bind(this)
             );
-            this.editor.addCommand(
+            editor.addCommand(
                 KM.WinCtrl | KC.Enter,
                 this.command_save_and_repl.bind(this)
             );
-            this.editor.addCommand(
+            editor.addCommand(
                 KM.WinCtrl | KM.Shift | KC.Enter,
                 this.command_commit_and_repl.bind(this)
             );
-            this.editor.addCommand(
+            editor.addCommand(
                 KM.CtrlCmd | KC.KEY_R,
                 this.command_reset_to_saved.bind(this)
             );
 
-            if (this.options.highlight !== null) {
-                var hl = this.editor.deltaDecorations([], [
-                    { range: new monaco.Range(this.options.highlight + 1,1,this.options.highlight + 1,1), options: { isWholeLine: true, className: 'snek-bedit-hl' }},
+            let highlight = this.deferred.highlight;
+            if (highlight !== null) {
+                var hl = editor.deltaDecorations([], [
+                    { range: new monaco.Range(highlight + 1,1,highlight + 1,1), options: { isWholeLine: true, className: 'snek-bedit-hl' }},
                 ]);
-                this.editor.revealLineInCenter(this.options.highlight + 1);
-                this.editor.getModel().onDidChangeContent(
+                editor.revealLineInCenter(highlight + 1);
+                editor.getModel().onDidChangeContent(
                     () => {
-                        hl = this.editor.deltaDecorations(hl, []);
+                        hl = editor.deltaDecorations(hl, []);
+                        this.deferred.highlight = null;
                     }
                 )
             }
 
-            this.editor.getModel().onDidChangeContent(
+            editor.getModel().onDidChangeContent(
                 () => {
                     if (this.status !== "error") {
                         this.inferStatus();
@@ -180,7 +203,7 @@ define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
                 return sel;
             }
 
-            this.editor.addAction({
+            editor.addAction({
                 id: 'sktk-probe',
                 label: 'Probe',
                 keybindings: [KM.chord(KM.CtrlCmd | KM.Alt | KC.KEY_P, KC.KEY_P)],
@@ -193,7 +216,7 @@ define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
                 }
             });
 
-            this.editor.addAction({
+            editor.addAction({
                 id: 'sktk-local-probe',
                 label: 'Local probe',
                 keybindings: [KM.chord(KM.CtrlCmd | KM.Alt | KC.KEY_P, KC.KEY_L)],
@@ -206,7 +229,7 @@ define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
                 }
             });
 
-            this.editor.addAction({
+            editor.addAction({
                 id: 'sktk-explore',
                 label: 'Explore',
                 keybindings: [KM.chord(KM.CtrlCmd | KM.Alt | KC.KEY_P, KC.KEY_E)],
@@ -219,7 +242,7 @@ define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
                 }
             });
 
-            this.editor.addAction({
+            editor.addAction({
                 id: 'sktk-local-explore',
                 label: 'Local explore',
                 keybindings: [KM.chord(KM.CtrlCmd | KM.Alt | KC.KEY_P, KC.KEY_X)],
@@ -232,7 +255,7 @@ define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
                 }
             });
 
-            this.editor.addAction({
+            editor.addAction({
                 id: 'sktk-accumulate',
                 label: 'Accumulate',
                 keybindings: [KM.chord(KM.CtrlCmd | KM.Alt | KC.KEY_P, KC.KEY_A)],
@@ -244,17 +267,19 @@ define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
                     this.options.py.accumulate(selectedWord(ed));
                 }
             });
+
+            return editor;
         }
 
-        event_updateHeight() {
+        event_updateHeight(editor) {
             const contentHeight = Math.min(
                 this.options.max_height || 500,
-                this.editor.getContentHeight()
+                editor.getContentHeight()
             );
             this.container.style.height = `${contentHeight}px`;
             // Normally the relayout should be automatic, but doing it here
             // avoids some flickering
-            this.editor.layout({
+            editor.layout({
                 width: this.container.offsetWidth - 10,
                 height: contentHeight
             });
@@ -281,10 +306,11 @@ define(["vs/editor/editor.main", "scripts/repl"], (monaco, repl) => {
         }
 
         async command_reset_to_saved() {
-            this.editor.setValue(this.content.saved);
+            this.deferred.setValue(this.content.saved);
             this.inferStatus();
         }
 
     }
     return LiveEditor;
-});
+    }
+);
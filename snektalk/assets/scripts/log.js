@@ -0,0 +1,119 @@
+
+define([], () => {
+
+    class LogView {
+        // Append-only view of the lines printed by an evaluation. Repeated
+        // lines are collapsed and only the last maxLines are kept, but all
+        // lines can be searched on the server with search(logid, query).
+        constructor(logid, search, maxLines = 2000) {
+            this.logid = logid;
+            this.search = search;
+            this.maxLines = maxLines;
+            this.dropped = 0;
+            this.lastText = null;
+            this.lastStream = null;
+            this.lastCount = 0;
+
+            this.element = document.createElement("div");
+            // snek-live prevents the virtualizer from serializing it
+            this.element.className = "snek-log snek-live";
+
+            this.toolbar = document.createElement("div");
+            this.toolbar.className = "snek-log-toolbar";
+            this.note = document.createElement("span");
+            this.note.className = "snek-note";
+            this.filter = document.createElement("input");
+            this.filter.className = "snek-log-search";
+            this.filter.placeholder = "search";
+            this.filter.onkeydown = evt => {
+                evt.stopPropagation();
+                if (evt.key === "Enter") {
+                    this.runSearch(this.filter.value);
+                }
+                else if (evt.key === "Escape") {
+                    this.filter.value = "";
+                    this.runSearch("");
+                }
+            };
+            this.toolbar.appendChild(this.note);
+            this.toolbar.appendChild(this.filter);
+
+            this.results = document.createElement("div");
+            this.results.className = "snek-log-results";
+            this.lines = document.createElement("div");
+            this.lines.className = "snek-log-lines";
+
+            this.element.appendChild(this.toolbar);
+            this.element.appendChild(this.results);
+            this.element.appendChild(this.lines);
+        }
+
+        addLines(lines, stream = null) {
+            let frag = document.createDocumentFragment();
+            let last = this.lines.lastChild;
+            for (let text of lines) {
+                if (text === this.lastText && stream === this.lastStream) {
+                    this.lastCount++;
+                    let counter = last.querySelector(".snek-log-count");
+                    if (counter === null) {
+                        counter = document.createElement("span");
+                        counter.className = "snek-log-count";
+                        last.appendChild(counter);
+                    }
+                    counter.innerText = `×${this.lastCount}`;
+                    continue;
+                }
+                last = document.createElement("div");
+                last.className = "snek-log-line";
+                if (stream) {
+                    last.classList.add(`snek-log-${stream}`);
+                }
+                let span = document.createElement("span");
+                span.textContent = text;
+                last.appendChild(span);
+                frag.appendChild(last);
+                this.lastText = text;
+                this.lastStream = stream;
+                this.lastCount = 1;
+            }
+            this.lines.appendChild(frag);
+
+            let excess = this.lines.children.length - this.maxLines;
+            for (let i = 0; i < excess; i++) {
+                this.lines.removeChild(this.lines.firstChild);
+            }
+            if (excess > 0) {
+                this.dropped += excess;
+                this.note.innerText =
+                    `${this.dropped} earlier lines are not shown`;
+            }
+        }
+
+        async runSearch(query) {
+            while (this.results.firstChild) {
+                this.results.removeChild(this.results.firstChild);
+            }
+            if (!query) {
+                return;
+            }
+            let matches = await this.search(this.logid, query);
+            for (let [index, text] of matches) {
+                let line = document.createElement("div");
+                line.className = "snek-log-line";
+                let num = document.createElement("span");
+                num.className = "snek-log-index";
+                num.innerText = index;
+                let span = document.createElement("span");
+                span.textContent = text;
+                line.appendChild(num);
+                line.appendChild(span);
+                this.results.appendChild(line);
+            }
+            if (!matches.length) {
+                this.results.innerText = "no matches";
+            }
+        }
+    }
+
+    return LogView;
+});
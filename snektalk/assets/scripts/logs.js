@@ -0,0 +1,175 @@
+
+define([], () => {
+
+    const LEVELS = [
+        ["DEBUG", 10],
+        ["INFO", 20],
+        ["WARNING", 30],
+        ["ERROR", 40],
+        ["CRITICAL", 50],
+    ];
+
+    function formatTime(t) {
+        let d = new Date(t * 1000);
+        let ms = String(d.getMilliseconds()).padStart(3, "0");
+        return `${d.toLocaleTimeString("en-gb")}.${ms}`;
+    }
+
+    class LogPanel {
+        // Filtering is done on the client, by hiding the rows that do not
+        // match, so that changing the filters costs no round trip
+        constructor(element, options) {
+            this.element = element;
+            this.options = options;
+            this.pending = [];
+            this.scheduled = false;
+            this.loggers = new Set();
+
+            this.element.className = "snek-logs";
+
+            let toolbar = document.createElement("div");
+            toolbar.className = "snek-logs-toolbar";
+            this.level = document.createElement("select");
+            for (let [name, levelno] of LEVELS) {
+                let option = document.createElement("option");
+                option.value = levelno;
+                option.innerText = name;
+                this.level.appendChild(option);
+            }
+            this.level.onchange = () => this.refilter();
+            this.logger = document.createElement("input");
+            this.logger.placeholder = "logger";
+            this.logger.setAttribute("list", `${element.id}-loggers`);
+            this.logger.oninput = () => this.refilter();
+            this.logger.onkeydown = evt => evt.stopPropagation();
+            this.loggerList = document.createElement("datalist");
+            this.loggerList.id = `${element.id}-loggers`;
+            this.count = document.createElement("span");
+            this.count.className = "snek-note";
+            toolbar.appendChild(this.level);
+            toolbar.appendChild(this.logger);
+            toolbar.appendChild(this.loggerList);
+            toolbar.appendChild(this.count);
+
+            this.body = document.createElement("div");
+            this.body.className = "snek-logs-body";
+
+            this.element.appendChild(toolbar);
+            this.element.appendChild(this.body);
+        }
+
+        add(entries) {
+            // Coalesce batches to at most one render per frame
+            this.pending.push(...entries);
+            let excess = this.pending.length - this.options.maxlen;
+            if (excess > 0) {
+                this.pending.splice(0, excess);
+            }
+            if (!this.scheduled && !this.suspended) {
+                this.scheduled = true;
+                requestAnimationFrame(() => {
+                    this.scheduled = false;
+                    this.render();
+                });
+            }
+        }
+
+        suspend() {
+            this.suspended = true;
+        }
+
+        resume() {
+            this.suspended = false;
+            this.render();
+        }
+
+        matches(row) {
+            let query = this.logger.value;
+            return (
+                row.levelno >= Number(this.level.value)
+                && (!query || row.logger.startsWith(query))
+            );
+        }
+
+        makeRow(entry) {
+            let row = document.createElement("div");
+            row.className = `snek-logrec snek-logrec-${entry.level}`;
+            row.levelno = entry.levelno;
+            row.logger = entry.name;
+            for (let [cls, text] of [
+                ["time", formatTime(entry.time)],
+                ["level", entry.level],
+                ["name", entry.name],
+                ["message", entry.message],
+            ]) {
+                let cell = document.createElement("span");
+                cell.className = `snek-logrec-${cls}`;
+                cell.textContent = text;
+                row.appendChild(cell);
+            }
+            if (entry.exc !== null) {
+                let button = document.createElement("span");
+                button.className = "snek-button";
+                button.innerText = "traceback";
+                button.onclick = async evt => {
+                    evt.stopPropagation();
+                    if (row.traceback) {
+                        row.traceback.classList.toggle("snek-hidden");
+                        return;
+                    }
+                    let html = await window.snektalk.get_external(entry.exc)();
+                    row.traceback = window.snektalk.reify(html);
+                    row.traceback.className = "snek-logrec-traceback";
+                    row.appendChild(row.traceback);
+                };
+                row.appendChild(button);
+            }
+            return row;
+        }
+
+        render() {
+            let atBottom = (
+                this.body.scrollTop + this.body.clientHeight
+                >= this.body.scrollHeight - 5
+            );
+            let frag = document.createDocumentFragment();
+            for (let entry of this.pending) {
+                let row = this.makeRow(entry);
+                row.style.display = this.matches(row) ? "" : "none";
+                frag.appendChild(row);
+                if (!this.loggers.has(entry.name)) {
+                    this.loggers.add(entry.name);
+                    let option = document.createElement("option");
+                    option.value = entry.name;
+                    this.loggerList.appendChild(option);
+                }
+            }
+            this.pending = [];
+            this.body.appendChild(frag);
+            while (this.body.children.length > this.options.maxlen) {
+                this.body.removeChild(this.body.firstChild);
+            }
+            if (atBottom) {
+                this.body.scrollTop = this.body.scrollHeight;
+            }
+            this.updateCount();
+        }
+
+        refilter() {
+            for (let row of this.body.children) {
+                row.style.display = this.matches(row) ? "" : "none";
+            }
+            this.updateCount();
+        }
+
+        updateCount() {
+            let shown = 0;
+            for (let row of this.body.children) {
+                shown += row.style.display !== "none";
+            }
+            this.count.innerText = `${shown}/${this.body.children.length}`;
+        }
+    }
+
+    return LogPanel;
+});
@@ -0,0 +1,103 @@
+
+define([], () => {
+
+    class PagedView {
+        constructor(element, options) {
+            this.element = element;
+            this.options = options;
+            this.rows = new Map();
+            this.timer = null;
+
+            this.element.className = "snek-paged";
+
+            this.filter = document.createElement("input");
+            this.filter.className = "snek-paged-filter";
+            this.filter.placeholder = `filter ${options.keys.length} names`;
+            this.filter.oninput = () => {
+                clearTimeout(this.timer);
+                this.timer = setTimeout(() => this.render(), 100);
+            };
+            this.filter.onclick = evt => evt.stopPropagation();
+
+            this.body = document.createElement("div");
+            this.body.className = "snek-paged-body";
+
+            this.element.appendChild(this.filter);
+            this.element.appendChild(this.body);
+
+            this.observer = new IntersectionObserver(
+                entries => {
+                    for (let entry of entries) {
+                        if (entry.isIntersecting) {
+                            this.observer.unobserve(entry.target);
+                            this.load(entry.target);
+                        }
+                    }
+                },
+                {rootMargin: "300px"}
+            );
+
+            this.render();
+        }
+
+        row(key) {
+            let row = this.rows.get(key);
+            if (row === undefined) {
+                row = document.createElement("div");
+                row.className = "snek-paged-pending";
+                row.innerText = key;
+            }
+            return row;
+        }
+
+        render() {
+            let query = this.filter.value.toLowerCase();
+            let keys = this.options.keys;
+            if (query) {
+                keys = keys.filter(k => k.toLowerCase().includes(query));
+            }
+            this.observer.disconnect();
+            this.body.innerHTML = "";
+            for (let i = 0; i < keys.length; i += this.options.pagesize) {
+                let page = document.createElement("div");
+                page.keys = keys.slice(i, i + this.options.pagesize);
+                this.fillPage(page);
+                this.body.appendChild(page);
+            }
+        }
+
+        fillPage(page) {
+            page.innerHTML = "";
+            for (let key of page.keys) {
+                page.appendChild(this.row(key));
+            }
+            if (page.keys.some(k => !this.rows.has(k))) {
+                this.observer.observe(page);
+            }
+        }
+
+        async load(page) {
+            let missing = page.keys.filter(k => !this.rows.has(k));
+            let html = await this.options.load(missing);
+            let content = window.snektalk.reify(html);
+            for (let row of content.querySelectorAll("[snek-key]")) {
+                if (!row.parentElement.closest("[snek-key]")) {
+                    this.rows.set(row.getAttribute("snek-key"), row);
+                }
+            }
+            for (let key of missing) {
+                if (!this.rows.has(key)) {
+                    let row = document.createElement("div");
+                    row.className = "snek-paged-missing";
+                    row.innerText = key;
+                    this.rows.set(key, row);
+                }
+            }
+            if (page.parentElement === this.body) {
+                this.fillPage(page);
+            }
+        }
+    }
+
+    return PagedView;
+});
@@ -0,0 +1,142 @@
+
+define([], () => {
+
+    function formatDuration(t) {
+        if (t === null || t === undefined || !isFinite(t)) {
+            return "?";
+        }
+        t = Math.round(t);
+        let h = Math.floor(t / 3600);
+        let m = Math.floor((t % 3600) / 60);
+        let s = t % 60;
+        let pad = x => String(x).padStart(2, "0");
+        return h ? `${h}:${pad(m)}:${pad(s)}` : `${pad(m)}:${pad(s)}`;
+    }
+
+    function formatRate(rate, unit) {
+        if (!rate) {
+            return `? ${unit}/s`;
+        }
+        else if (rate >= 1) {
+            return `${rate.toFixed(2)} ${unit}/s`;
+        }
+        else {
+            return `${(1 / rate).toFixed(2)} s/${unit}`;
+        }
+    }
+
+    function sparkline(values, width, height) {
+        // Polyline points for values, scaled to fit width x height
+        let max = Math.max(...values) || 1;
+        let step = values.length > 1 ? width / (values.length - 1) : 0;
+        return values.map((v, i) => {
+            let x = i * step;
+            let y = height - height * v / max;
+            return `${x.toFixed(1)},${y.toFixed(1)}`;
+        }).join(" ");
+    }
+
+    class ProgressBar {
+        constructor(element, options) {
+            this.element = element;
+            this.options = options;
+            this.scheduled = false;
+
+            this.element.className = "snek-progress";
+            this.desc = document.createElement("span");
+            this.desc.className = "snek-progress-desc";
+            this.bar = document.createElement("div");
+            this.bar.className = "snek-progress-bar";
+            this.fill = document.createElement("div");
+            this.fill.className = "snek-progress-fill";
+            this.bar.appendChild(this.fill);
+            this.stats = document.createElement("span");
+            this.stats.className = "snek-progress-stats";
+
+            let ns = "http://www.w3.org/2000/svg";
+            this.spark = document.createElementNS(ns, "svg");
+            this.spark.setAttribute("class", "snek-progress-spark");
+            this.spark.setAttribute("width", 60);
+            this.spark.setAttribute("height", 12);
+            this.sparkLine = document.createElementNS(ns, "polyline");
+            this.spark.appendChild(this.sparkLine);
+
+            this.element.appendChild(this.desc);
+            this.element.appendChild(this.bar);
+            this.element.appendChild(this.stats);
+            this.element.appendChild(this.spark);
+
+            this.update(options.state);
+        }
+
+        update(state) {
+            // Coalesce updates to at most one render per frame
+            this.state = state;
+            if (!this.scheduled && !this.suspended) {
+                this.scheduled = true;
+                requestAnimationFrame(() => {
+                    this.scheduled = false;
+                    this.render();
+                });
+            }
+        }
+
+        suspend() {
+            this.suspended = true;
+        }
+
+        resume() {
+            this.suspended = false;
+            this.render();
+        }
+
+        render() {
+            let st = this.state;
+            let unit = st.unit || "it";
+            this.desc.innerText = st.desc || "";
+
+            if (st.total) {
+                let frac = Math.min(1, st.n / st.total);
+                this.fill.style.width = `${100 * frac}%`;
+                this.bar.classList.remove("snek-progress-unknown");
+            }
+            else {
+                this.fill.style.width = "100%";
+                this.bar.classList.add("snek-progress-unknown");
+            }
+
+            if (st.failures) {
+                this.bar.classList.add("snek-progress-failures");
+            }
+            if (st.closed) {
+                this.element.classList.add("snek-progress-closed");
+                if (st.leave === false) {
+                    this.element.classList.add("snek-progress-gone");
+                }
+            }
+
+            // Time per iteration between refreshes
+            let history = st.history || [];
+            this.spark.style.display = history.length > 1 ? "" : "none";
+            this.sparkLine.setAttribute("points", sparkline(history, 60, 12));
+
+            let parts = [
+                st.total ? `${st.n}/${st.total}` : `${st.n}`,
+                formatRate(st.rate, unit),
+                `${formatDuration(st.elapsed)}`,
+            ];
+            if (st.total && !st.closed) {
+                parts.push(`ETA ${formatDuration(st.eta)}`);
+            }
+            if (st.failures) {
+                parts.push(`${st.failures} failed`);
+            }
+            if (st.postfix) {
+                parts.push(st.postfix);
+            }
+            this.stats.innerText = parts.join(" | ");
+        }
+    }
+
+    return ProgressBar;
+});
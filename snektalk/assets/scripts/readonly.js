@@ -1,6 +1,8 @@
 
 require.config({ paths: { "vs": "/lib/vs" }});
-define(["vs/editor/editor.main"], (monaco) => {
+define(
+    ["vs/editor/editor.main", "scripts/deferred"],
+    (monaco, DeferredEditor) => {
 
     class ReadOnlyEditor {
         constructor(element, options) {
@@ -18,6 +20,10 @@ define(["vs/editor/editor.main"], (monaco) => {
             );
         }
 
+        get editor() {
+            return this.deferred.editor;
+        }
+
         setupElement() {
             this.element.className = "snek-bedit-readonly";
 
@@ -36,39 +42,60 @@ define(["vs/editor/editor.main"], (monaco) => {
 
         setupEditor() {
             this.container.style.height = (19 * 7) + "px";
-            this.editor = monaco.editor.create(this.container, {
-                value: "",
-                language: 'python',
-                lineNumbers: false,
-                minimap: {enabled: false},
-                scrollBeyondLastLine: false,
-                overviewRulerLanes: 0,
-                folding: false,
-                readOnly: true,
+            // The Monaco editor is only created when the container comes
+            // into view or is focused
+            this.deferred = new DeferredEditor(this.container, {
+                create: (container, value) => {
+                    let editor = monaco.editor.create(container, {
+                        value: value,
+                        language: 'python',
+                        lineNumbers: false,
+                        minimap: {enabled: false},
+                        scrollBeyondLastLine: false,
+                        overviewRulerLanes: 0,
+                        folding: false,
+                        readOnly: true,
+                    });
+                    this.hl = [];
+                    this.decorate(editor);
+                    return editor;
+                }
             });
-            this.hl = [];
+        }
+
+        suspend() {
+            this.deferred.release();
         }
 
         update(new_content, filename, firstlineno, highlight) {
             this.filename = filename;
             this.firstlineno = firstlineno;
-            highlight -= firstlineno;
-            this.editor.setValue(new_content);
+            this.highlight = highlight === null ? null : highlight - firstlineno;
             this.status.innerText = filename;
-            this.editor.updateOptions({
+            this.deferred.setValue(new_content, this.highlight);
+            if (this.editor) {
+                this.decorate(this.editor);
+            }
+        }
+
+        decorate(editor) {
+            let firstlineno = this.firstlineno;
+            let highlight = this.highlight;
+            editor.updateOptions({
                 lineNumbers: i => i + firstlineno - 1
             });
             if (highlight !== null) {
-                this.hl = this.editor.deltaDecorations(this.hl, [
+                this.hl = editor.deltaDecorations(this.hl, [
                     {
                         range: new monaco.Range(highlight + 1,1,highlight + 1,1),
                         options: { isWholeLine: true, className: 'snek-bedit-hl' }
                     },
                 ]);
-                this.editor.revealLineInCenter(highlight + 1);
+                editor.revealLineInCenter(highlight + 1);
             }
         }
     }
 
     return ReadOnlyEditor;
-});
+    }
+);
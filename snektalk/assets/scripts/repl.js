@@ -40,7 +40,15 @@ function isElementInViewport(el) {
 }
 
 require.config({ paths: { 'vs': '/lib/vs' }});
-define(["vs/editor/editor.main", "lib/mousetrap.min"], (monaco, Mousetrap) => {
+define(
+    [
+        "vs/editor/editor.main",
+        "lib/mousetrap.min",
+        "scripts/log",
+        "scripts/virtual",
+        "scripts/interactors",
+    ],
+    (monaco, Mousetrap, LogView, Virtualizer, InteractorRegistry) => {
 
 Mousetrap.prototype.stopCallback = () => false;
 
@@ -321,8 +329,16 @@ class Repl {
         this.container = target;
         this.options = {};
         this.lib = {};
+        // HTML the server can refer to by key, see recv_uncache
+        this.htmlCache = new Map();
+        // Current LogView for each log id, see recv_print
+        this.logs = new Map();
         this.pane = target.querySelector(".snek-pane");
         this.outerPane = target.querySelector(".snek-outer-pane");
+        this.interactors = new InteractorRegistry();
+        this.virtualizer = new Virtualizer(
+            this.outerPane, {activate: node => this.activateLazy(node)}
+        );
         this.pinpane = new PinPane(target.querySelector(".snek-pin-pane"));
         this.pinpane.setup(this);
         this.inputOuter = target.querySelector(".snek-input-box");
@@ -381,6 +397,18 @@ class Repl {
         this.$currid = 0;
         this.$responseMap = {};
 
+        this.lazyObserver = new IntersectionObserver(
+            entries => {
+                for (let entry of entries) {
+                    if (entry.isIntersecting) {
+                        this.lazyObserver.unobserve(entry.target);
+                        this.loadLazy(entry.target);
+                    }
+                }
+            },
+            {rootMargin: "200px"}
+        );
+
         this.$$addClickHandlers();
 
         exports.mainRepl = this;
@@ -607,7 +635,10 @@ class Repl {
 
         editor.addCommand(
             KM.WinCtrl | KC.KEY_L,
-            () => { this.pane.innerHTML = ""; }
+            () => {
+                this.pane.innerHTML = "";
+                this.virtualizer.clear();
+            }
         );
 
         editor.addCommand(
@@ -781,9 +812,58 @@ class Repl {
         let rval = document.createElement("div");
         rval.innerHTML = html;
         activateScripts(rval);
+        this.activateLazy(rval);
+        this.interactors.activate(rval);
         return rval;
     }
 
+    activateLazy(node) {
+        // Elements with the snek-lazy class are placeholders for content
+        // that is only rendered by the server when it becomes visible,
+        // or when it is clicked if the lazytrigger attribute is "click"
+        for (let elem of node.querySelectorAll(".snek-lazy")) {
+            if (elem.getAttribute("lazytrigger") === "click") {
+                elem.onclick = evt => {
+                    evt.stopPropagation();
+                    this.loadLazy(elem);
+                };
+            }
+            else {
+                this.lazyObserver.observe(elem);
+            }
+        }
+    }
+
+    async loadLazy(elem) {
+        if (elem.$$loading) {
+            return;
+        }
+        elem.$$loading = true;
+        elem.classList.add("snek-lazy-loading");
+        let load = this.get_external(parseInt(elem.getAttribute("lazyid")));
+        // Several placeholders may share a callback, which takes the value
+        // of their lazyarg attribute
+        let arg = elem.getAttribute("lazyarg");
+        try {
+            let content = this.reify(
+                await (arg === null ? load() : load(arg))
+            );
+            elem.innerHTML = "";
+            while (content.firstChild) {
+                elem.appendChild(content.firstChild);
+            }
+            elem.classList.remove("snek-lazy");
+            elem.removeAttribute("lazyid");
+            elem.onclick = null;
+        }
+        catch(exc) {
+            let message = `${exc.type}: ${exc.message}`;
+            this.setStatus({type: "error", value: message});
+            elem.$$loading = false;
+        }
+        elem.classList.remove("snek-lazy-loading");
+    }
+
     readOnlyEditor(text, language) {
         let elem = document.createElement("div");
         elem.style.width = this.pane.offsetWidth - 100;
@@ -805,6 +885,7 @@ class Repl {
         elem.classList.add("snek-result");
         elem.classList.add("snek-t-" + type);
         (target || this.pane).appendChild(wrapper);
+        this.virtualizer.watch(wrapper);
         return wrapper;
     }
 
@@ -847,6 +928,12 @@ class Repl {
 
         socket.addEventListener('message', event => {
             let data = JSON.parse(event.data);
+            if (data.cache_key) {
+                this.htmlCache.set(data.cache_key, data.value);
+            }
+            else if (data.cached) {
+                data.value = this.htmlCache.get(data.cached);
+            }
             this.find_method("recv", data.command, this.recv_bad)(data)
         });
 
@@ -914,9 +1001,8 @@ class Repl {
         document.head.appendChild(elem);
     }
 
-    recv_result(data) {
-        let elem = this.reify(data.value);
-        let evalid = !data.evalid ? `E${++evalIdGen}` : data.evalid
+    printBox(evalid) {
+        evalid = !evalid ? `E${++evalIdGen}` : evalid
         let prbox = document.getElementById("pr-eval-" + evalid);
         if (prbox === null) {
             prbox = document.createElement("div");
@@ -924,15 +1010,110 @@ class Repl {
             this.events.printbox.run(prbox);
             this.pane.appendChild(prbox);
         }
+        return prbox;
+    }
+
+    recv_result(data) {
+        let elem = this.reify(data.value);
+        let prbox = this.printBox(data.evalid);
         if (data.type === "statement") { }
         else {
             this.append(elem, data.type, prbox);
+            if (data.pin) {
+                this.pinpane.pin(elem);
+            }
+        }
+    }
+
+    recv_print(data) {
+        // Plain lines of text, which are not HTML. The server starts a new
+        // log whenever something else is displayed.
+        let log = this.logs.get(data.log);
+        if (!log) {
+            log = new LogView(
+                data.log, (logid, query) => this.lib.search_log(logid, query)
+            );
+            this.append(log.element, "print", this.printBox(data.evalid));
+            this.logs.set(data.log, log);
+            if (this.logs.size > 100) {
+                this.logs.delete(this.logs.keys().next().value);
+            }
+        }
+        log.addLines(data.lines, data.stream);
+    }
+
+    getElement(id) {
+        // The element may be in a line that was detached by the virtualizer
+        return document.getElementById(id) || this.virtualizer.find(id);
+    }
+
+    reifyFragment(html) {
+        // Unlike reify, this can parse fragments such as <tr>...</tr>
+        let template = document.createElement("template");
+        template.innerHTML = html;
+        let frag = template.content;
+        for (let child of frag.childNodes) {
+            activateScripts(child);
+        }
+        this.activateLazy(frag);
+        this.interactors.activate(frag);
+        return frag;
+    }
+
+    applyPatch(root, [op, path, arg]) {
+        let node = root;
+        for (let i of path) {
+            node = node.childNodes[i];
+            if (node === undefined) {
+                throw new Error("The element to patch does not exist");
+            }
+        }
+        if (op === "replace") {
+            node.replaceWith(this.reifyFragment(arg));
+        }
+        else if (op === "text") {
+            node.data = arg;
+        }
+        else if (op === "attrs") {
+            for (let [key, value] of Object.entries(arg)) {
+                if (value === null) {
+                    node.removeAttribute(key);
+                }
+                else {
+                    node.setAttribute(key, value);
+                }
+            }
+        }
+        else if (op === "append") {
+            node.appendChild(this.reifyFragment(arg));
+        }
+        else if (op === "truncate") {
+            while (node.childNodes.length > arg) {
+                node.removeChild(node.lastChild);
+            }
+        }
+    }
+
+    recv_patch(data) {
+        // Patches are relative to the wrapper created by recv_fill
+        let target = this.getElement(data.target);
+        if (target === null) {
+            return;
+        }
+        try {
+            for (let patch of data.patches) {
+                this.applyPatch(target.firstChild, patch);
+            }
+        }
+        catch (exc) {
+            // The element was modified on this side, e.g. by a script
+            this.lib.resync(data.target);
         }
     }
 
     recv_fill(data) {
         let elem = this.reify(data.value);
-        let target = document.getElementById(data.target);
+        let target = this.getElement(data.target);
         while (target.firstChild) {
             target.removeChild(target.firstChild);
         }
@@ -941,8 +1122,23 @@ class Repl {
 
     recv_insert(data) {
         let elem = this.reify(data.value);
-        let target = document.getElementById(data.target);
-        if (data.index === undefined || data.index === null) {
+        let target = this.getElement(data.target);
+        if (data.maxlen) {
+            // Append each child separately and only keep the last maxlen
+            let atBottom = (
+                target.scrollTop + target.clientHeight >= target.scrollHeight - 5
+            );
+            while (elem.firstChild) {
+                target.appendChild(elem.firstChild);
+            }
+            while (target.children.length > data.maxlen) {
+                target.removeChild(target.firstChild);
+            }
+            if (atBottom) {
+                target.scrollTop = target.scrollHeight;
+            }
+        }
+        else if (data.index === undefined || data.index === null) {
             target.appendChild(elem);
         }
         else {
@@ -951,7 +1147,7 @@ class Repl {
     }
 
     recv_clear(data) {
-        let target = document.getElementById(data.target);
+        let target = this.getElement(data.target);
         while (target.firstChild) {
             target.removeChild(target.firstChild);
         }
@@ -1021,6 +1217,12 @@ class Repl {
         }
     }
 
+    recv_uncache(data) {
+        for (let key of data.keys) {
+            this.htmlCache.delete(key);
+        }
+    }
+
     recv_bad(data) {
         console.error("Received an unknown command:", data.command);
     }
@@ -0,0 +1,142 @@
+
+define([], () => {
+
+    function forEachHandler(node, fn) {
+        // Interactor instances are stored in the handler field of their
+        // element
+        for (let elem of node.querySelectorAll("[id]")) {
+            if (elem.handler) {
+                fn(elem.handler);
+            }
+        }
+    }
+
+    class Virtualizer {
+        // Detach the contents of the lines of the output pane that are far
+        // from the viewport, and reattach them when they come close. The
+        // lines keep their height so that the scroll position is stable.
+        //
+        // Detached contents are kept in a DocumentFragment, which keeps
+        // their state, and the suspend() method of the interactors they
+        // contain is called. Beyond maxLive detached lines, the oldest ones
+        // that contain no scripts, interactors or other live elements are
+        // serialized to HTML and their nodes are released.
+        constructor(root, options = {}) {
+            this.root = root;
+            this.maxLive = options.maxLive || 500;
+            this.activate = options.activate || (node => null);
+            this.live = new Set();
+            this.ids = new Map();
+            this.observer = new IntersectionObserver(
+                entries => {
+                    for (let entry of entries) {
+                        if (entry.isIntersecting) {
+                            this.attach(entry.target);
+                        }
+                        else {
+                            this.detach(entry.target);
+                        }
+                    }
+                },
+                {root: root, rootMargin: options.margin || "3000px 0px"}
+            );
+        }
+
+        watch(line) {
+            this.observer.observe(line);
+        }
+
+        find(id) {
+            // Find an element by id in the detached lines. The line stays
+            // detached, so that updates to elements that are far from the
+            // viewport do not bring them back in the document.
+            let line = this.ids.get(id);
+            if (line === undefined || !line.$$detached) {
+                return null;
+            }
+            if (typeof line.$$detached === "string") {
+                line.$$detached = this.deserialize(line.$$detached);
+                this.live.add(line);
+            }
+            return line.$$detached.getElementById(id);
+        }
+
+        deserialize(html) {
+            let holder = document.createElement("div");
+            holder.innerHTML = html;
+            this.activate(holder);
+            let frag = document.createDocumentFragment();
+            while (holder.firstChild) {
+                frag.appendChild(holder.firstChild);
+            }
+            return frag;
+        }
+
+        clear() {
+            this.observer.disconnect();
+            this.live.clear();
+            this.ids.clear();
+        }
+
+        detach(line) {
+            if (line.$$detached
+                || !line.isConnected
+                || line.contains(document.activeElement)) {
+                return;
+            }
+            line.style.height = `${line.offsetHeight}px`;
+            forEachHandler(line, h => h.suspend && h.suspend());
+            for (let elem of line.querySelectorAll("[id]")) {
+                this.ids.set(elem.id, line);
+            }
+            let frag = document.createDocumentFragment();
+            while (line.firstChild) {
+                frag.appendChild(line.firstChild);
+            }
+            line.$$detached = frag;
+            line.classList.add("snek-line-detached");
+            this.live.add(line);
+            if (this.live.size > this.maxLive) {
+                this.serializeOldest();
+            }
+        }
+
+        attach(line) {
+            let contents = line.$$detached;
+            if (!contents) {
+                return;
+            }
+            line.$$detached = null;
+            this.live.delete(line);
+            if (typeof contents === "string") {
+                contents = this.deserialize(contents);
+            }
+            line.appendChild(contents);
+            for (let elem of line.querySelectorAll("[id]")) {
+                this.ids.delete(elem.id);
+            }
+            line.style.height = "";
+            line.classList.remove("snek-line-detached");
+            forEachHandler(line, h => h.resume && h.resume());
+        }
+
+        serializeOldest() {
+            // Sets iterate in insertion order, so the oldest come first
+            for (let line of this.live) {
+                if (this.live.size <= this.maxLive) {
+                    break;
+                }
+                let frag = line.$$detached;
+                if (frag.querySelector("script, [interactor], .snek-live")) {
+                    continue;
+                }
+                let holder = document.createElement("div");
+                holder.appendChild(frag);
+                line.$$detached = holder.innerHTML;
+                this.live.delete(line);
+            }
+        }
+    }
+
+    return Virtualizer;
+});
@@ -8,6 +8,7 @@ from jurigged.live import find_runner
 from jurigged.utils import glob_filter
 
 from .evaluator import Evaluator, threads
+from .feat.capture import FDCapture
 from .network import connect_to_existing
 from .server import serve
 
@@ -66,6 +67,15 @@ def cli():
     # [alias: -t]
     thread: Option & bool = default(False)
 
+    # Maximum number of threads running at the same time for /thread
+    max_threads: Option & int = default(None)
+
+    # Capture the output of C extensions and subprocesses
+    capture_fd: Option & bool = default(False)
+
+    # Cache the representations of objects that are displayed again
+    cache_renders: Option & bool = default(False)
+
     # Show the version
     version: Option & bool = default(False)
 
@@ -79,6 +89,9 @@ def cli():
         connect_to_existing(connect, port, socket)
         return
 
+    if max_threads is not None:
+        threads.max_workers = max_threads
+
     pattern = glob_filter(".")
     if no_watch:
         watch_args = None
@@ -99,9 +112,13 @@ def cli():
         watch_args=watch_args,
         template={"title": module or script or "snektalk"},
         restart_command=restart_command,
+        render_cache=cache_renders,
         **server_args,
     )
 
+    if capture_fd:
+        FDCapture(sess).start()
+
     opts = SimpleNamespace(module=module, script=script, rest=argv,)
 
     mod, run = find_runner(opts, pattern)
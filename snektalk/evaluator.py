@@ -1,16 +1,18 @@
 import ast
 import functools
 import re
-import subprocess
 import sys
+import threading
 import time
-from types import ModuleType
+from types import CodeType, ModuleType
 
-from hrepr import H
+from hrepr import H, hrepr
 from jurigged import CodeFile, registry
 from jurigged.recode import virtual_file
 
 from .feat.edit import edit
+from .feat.profile import Flamegraph, profile_call, sampler
+from .feat.shell import run_shell
 from .session import SnektalkInterrupt, current_session, threads
 from .version import version
 
@@ -34,6 +36,10 @@ def safe_fail(fn):
     return deco
 
 
+def is_repl_code(code):
+    return isinstance(code, CodeType) and code.co_filename.startswith("<repl#")
+
+
 def evaluate(expr, glb, lcl):
     filename = virtual_file("repl", expr)
     mname = glb.get("__name__", None)
@@ -167,20 +173,56 @@ class Evaluator:
                 )
 
     @safe_fail
-    def command_shell(self, expr, glb, lcl):
+    def command_profile(self, expr, glb, lcl):
         expr = expr.lstrip()
-        self.session.queue(command="echo", value=f"//{expr}", process=False)
-        proc = subprocess.run(expr, shell=True, capture_output=True)
-        if proc.stdout:
-            self.session.queue_result(
-                H.div["snek-shellout"](proc.stdout.decode("utf8")),
-                type="expression",
+        self.session.queue(
+            command="echo", value=f"/profile {expr}", process=False
+        )
+        prof = profile_call(
+            lambda: self.eval(expr, glb, lcl), name=expr, root=is_repl_code
+        )
+        self.session.blt["_"] = prof
+        self.session.queue_result(prof, type="expression")
+
+    @safe_fail
+    def command_sample(self, expr, glb, lcl):
+        expr = expr.strip()
+        self.session.queue(
+            command="echo", value=f"/sample {expr}", process=False
+        )
+        tname, _, action = expr.partition(" ")
+        action = action.strip() or "start"
+        if tname == "main":
+            thread = threading.main_thread()
+        elif tname in threads.threads:
+            thread = threads.threads[tname]
+        else:
+            raise Exception(
+                f"No thread named {tname}"
+                if tname
+                else "Please provide the name of the thread to sample"
             )
-        if proc.stderr:
+
+        if action == "start":
+            target = sampler.start(tname, thread, self.session)
+            self.session.queue(
+                command="result", value=target.view(), type="print", pin=True
+            )
+        elif action == "stop":
+            target = sampler.stop(tname)
+            target.refresh()
+            self.session.blt["_"] = target.tree
             self.session.queue_result(
-                H.div["snek-shellout"](proc.stderr.decode("utf8")),
-                type="exception",
+                Flamegraph(target.tree, unit="samples"), type="expression"
             )
+        else:
+            raise Exception(f"Unknown action '{action}', use start or stop")
+
+    @safe_fail
+    def command_shell(self, expr, glb, lcl):
+        expr = expr.lstrip()
+        self.session.queue(command="echo", value=f"//{expr}", process=False)
+        run_shell(expr, self.session)
 
     @safe_fail
     def command_thread(self, expr, glb, lcl):
@@ -189,12 +231,27 @@ class Evaluator:
         self.session.queue(command="echo", value=expr, process=False)
 
         def run():
+            if expr.startswith("//"):
+                return run_shell(expr[2:], self.session)
             result = self.eval(expr, glb, lcl)
             typ = "statement" if result is None else "expression"
             self.session.blt["_"] = result
             self.session.queue_result(result, type=typ)
+            return result
+
+        job = threads.run_in_thread(run, session=current_session())
+        self.session.blt["_"] = job
 
-        threads.run_in_thread(run, session=current_session())
+    @safe_fail
+    def command_jobs(self, expr, glb, lcl):
+        self.session.queue(command="echo", value="/jobs", process=False)
+        if not threads.history:
+            self.session.queue_result(H.div("No jobs"), type="print")
+            return
+        self.session.queue_result(
+            H.div["snek-jobs"](*map(hrepr, reversed(threads.history))),
+            type="expression",
+        )
 
     def command_quit(self, expr, glb, lcl):
         self.session.queue_result(H.div("/quit"), type="echo")
@@ -0,0 +1,139 @@
+import base64
+import struct
+import zlib
+
+from hrepr import H
+
+
+def is_ndarray(cls):
+    """Check if cls is numpy.ndarray or a subclass, without importing numpy."""
+    return any(
+        c.__module__ == "numpy" and c.__name__ == "ndarray"
+        for c in getattr(cls, "__mro__", ())
+    )
+
+
+#######
+# PNG #
+#######
+
+
+def _chunk(kind, data):
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    )
+
+
+def encode_png(pixels):
+    """Encode a uint8 array of shape (h, w), (h, w, 3) or (h, w, 4) as PNG."""
+    import numpy as np
+
+    if pixels.ndim == 2:
+        pixels = pixels[:, :, None]
+    h, w, c = pixels.shape
+    color_type = {1: 0, 3: 2, 4: 6}[c]
+    # Each scanline starts with the filter type, which is 0 (none)
+    raw = np.zeros((h, w * c + 1), dtype=np.uint8)
+    raw[:, 1:] = pixels.reshape(h, w * c)
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            _chunk(
+                b"IHDR", struct.pack(">IIBBBBB", w, h, 8, color_type, 0, 0, 0)
+            ),
+            _chunk(b"IDAT", zlib.compress(raw.tobytes())),
+            _chunk(b"IEND", b""),
+        ]
+    )
+
+
+#########
+# Stats #
+#########
+
+
+def array_stats(arr):
+    """Return a dictionary of summary statistics for a numeric array."""
+    import numpy as np
+
+    stats = {}
+    if arr.size == 0:
+        return stats
+    numeric = np.issubdtype(arr.dtype, np.number) or arr.dtype == bool
+    if not numeric:
+        return stats
+    nans = 0
+    if np.issubdtype(arr.dtype, np.inexact):
+        nans = int(np.count_nonzero(np.isnan(arr)))
+        stats["nan"] = nans
+    if nans == arr.size:
+        return stats
+    if not np.issubdtype(arr.dtype, np.complexfloating):
+        stats["min"] = np.nanmin(arr) if nans else arr.min()
+        stats["max"] = np.nanmax(arr) if nans else arr.max()
+    stats["mean"] = np.nanmean(arr) if nans else arr.mean()
+    return stats
+
+
+def thumbnail(arr, stats, size=128):
+    """Downsampled heatmap of a 2D array or of an image-like 3D array.
+
+    Returns the PNG as a data URL, or None if arr cannot be displayed.
+    """
+    import numpy as np
+
+    if "min" not in stats or arr.ndim not in (2, 3):
+        return None
+    if arr.ndim == 3:
+        if arr.shape[2] not in (3, 4):
+            arr = arr[0]
+    h, w = arr.shape[:2]
+    if h == 0 or w == 0:
+        return None
+    # Striding keeps the cost proportional to the size of the thumbnail
+    sample = arr[:: max(1, -(-h // size)), :: max(1, -(-w // size))]
+    lo, hi = float(stats["min"]), float(stats["max"])
+    scaled = (sample.astype(float) - lo) / ((hi - lo) or 1)
+    pixels = np.nan_to_num(scaled * 255, nan=0).clip(0, 255).astype(np.uint8)
+    data = base64.b64encode(encode_png(pixels)).decode()
+    return f"data:image/png;base64,{data}"
+
+
+#########
+# Hrepr #
+#########
+
+
+def _fmt(x):
+    try:
+        return f"{x:.6g}"
+    except (TypeError, ValueError):
+        return str(x)
+
+
+def array_summary(arr):
+    shape = "×".join(map(str, arr.shape)) or "scalar"
+    return f"{shape} {arr.dtype}"
+
+
+def array_hrepr(arr, H=H):
+    """Summary, thumbnail and head/tail of an array."""
+    import numpy as np
+
+    stats = array_stats(arr)
+    rows = [H.tr(H.td("shape"), H.td(str(arr.shape)))]
+    rows.append(H.tr(H.td("dtype"), H.td(str(arr.dtype))))
+    for k, v in stats.items():
+        rows.append(H.tr(H.td(k), H.td(_fmt(v))))
+
+    header = H.div["snek-array-header"](H.table["snek-array-stats"](*rows))
+    src = thumbnail(arr, stats)
+    if src is not None:
+        header = header(H.img["snek-array-thumbnail"](src=src))
+
+    # array2string only formats the edge items of large arrays
+    text = np.array2string(arr, threshold=200, edgeitems=3)
+    return H.div["snek-array"](header, H.pre["snek-array-data"](text))
@@ -0,0 +1,170 @@
+import re
+import weakref
+import zlib
+from collections import OrderedDict
+from itertools import count
+
+from hrepr import Tag
+
+from ..registry import callback_registry
+from .arrays import is_ndarray
+
+_count = count(1)
+
+# Callback ids embedded as $$SKTK(id), in sktk_json as {"$$SKTK": id}, or
+# as the lazyid or objid attributes
+_callback_id = re.compile(
+    r'\$\$SKTK(?:\(|&quot;: |": )(\d+)|(?:lazyid|objid)="(\d+)"'
+)
+
+
+def callback_ids(text):
+    """Return the ids of the callbacks embedded in HTML text."""
+    return {int(a or b) for a, b in _callback_id.findall(text)}
+
+
+def resolvable(ids):
+    """Whether all the callback ids can still be resolved."""
+    for cid in ids:
+        try:
+            callback_registry.resolve(cid)
+        except KeyError:
+            return False
+    return True
+
+
+def array_token(arr):
+    """Data pointer, layout and checksum of an array."""
+    if arr.dtype.hasobject:
+        return None
+    import numpy as np
+
+    data = np.ascontiguousarray(arr).reshape(-1).view(np.uint8)
+    return (
+        arr.__array_interface__["data"][0],
+        arr.shape,
+        arr.strides,
+        arr.dtype.str,
+        zlib.crc32(data),
+    )
+
+
+def version_token(obj):
+    """Return a value that changes when obj changes, or None if unknown.
+
+    Objects can define ``__snek_version__`` to return such a value. Arrays
+    use their data and builtin containers use their length, which will
+    not catch all changes.
+    """
+    hook = getattr(type(obj), "__snek_version__", None)
+    if hook is not None:
+        return ("version", hook(obj))
+    elif is_ndarray(type(obj)):
+        token = array_token(obj)
+        return token and ("array", token)
+    elif isinstance(
+        obj, (list, tuple, dict, set, frozenset, str, bytes, bytearray)
+    ):
+        return ("len", len(obj))
+    else:
+        return None
+
+
+class CachedHTML:
+    """Rendered HTML that the client can keep and reuse under a key."""
+
+    def __init__(self, html):
+        self.key = f"rc{next(_count)}"
+        self.text = str(html)
+        self.resources = html.collect_resources()
+        self.callbacks = callback_ids(self.text)
+
+    def resolvable(self):
+        """Whether all the callbacks in the HTML can still be resolved."""
+        return resolvable(self.callbacks)
+
+    def __str__(self):
+        return self.text
+
+
+class _Entry:
+    def __init__(self, obj, token, html):
+        try:
+            self.ref = weakref.ref(obj)
+            self.strong = False
+        except TypeError:
+            # Keep the object alive so that its id is not reused
+            self.ref = lambda: obj
+            self.strong = True
+        self.token = token
+        self.html = html
+
+
+class RenderCache:
+    """LRU cache of rendered HTML keyed on object identity and version.
+
+    Arguments:
+        maxsize: Maximum total size of the cached HTML, in characters.
+        maxstrong: Maximum number of entries for objects that cannot be
+            weakly referenced, such as lists and dicts, which the cache
+            must keep alive.
+    """
+
+    def __init__(self, maxsize=50_000_000, maxstrong=1000):
+        self.maxsize = maxsize
+        self.maxstrong = maxstrong
+        self.size = 0
+        self.nstrong = 0
+        self.entries = OrderedDict()
+        self.evicted = []
+
+    def get(self, obj, render, namespace=""):
+        """Return the cached rendering of obj, or call render() to make it.
+
+        Returns a CachedHTML if the result can be cached, otherwise the
+        return value of render().
+        """
+        token = version_token(obj)
+        if token is None:
+            return render()
+
+        key = (namespace, id(obj), type(obj))
+        entry = self.entries.get(key, None)
+        if (
+            entry is not None
+            and entry.ref() is obj
+            and entry.token == token
+            # The callbacks in the HTML may have been dropped by the registry
+            and entry.html.resolvable()
+        ):
+            self.entries.move_to_end(key)
+            return entry.html
+
+        html = render()
+        if not isinstance(html, Tag):
+            return html
+        cached = CachedHTML(html)
+        if "<script" in cached.text or " interactor=" in cached.text:
+            # Scripts and interactors cannot be displayed twice
+            return html
+
+        if entry is not None:
+            self._remove(key)
+        entry = self.entries[key] = _Entry(obj, token, cached)
+        self.size += len(cached.text)
+        self.nstrong += entry.strong
+        while self.size > self.maxsize and self.entries:
+            self._remove(next(iter(self.entries)))
+        if self.nstrong > self.maxstrong:
+            self._remove(next(k for k, e in self.entries.items() if e.strong))
+        return cached
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.size -= len(entry.html.text)
+        self.nstrong -= entry.strong
+        self.evicted.append(entry.html.key)
+
+    def pop_evicted(self):
+        evicted, self.evicted = self.evicted, []
+        return evicted
@@ -0,0 +1,136 @@
+import atexit
+import codecs
+import os
+import selectors
+import sys
+import threading
+import time
+from collections import deque
+
+
+class FDCapture:
+    """Capture the output written to file descriptors 1 and 2.
+
+    The file descriptors are redirected to pipes that are read by a
+    background thread, so this captures the output of C extensions and
+    subprocesses as well as writes to sys.stdout and sys.stderr. Complete
+    lines are sent to the session every ``flush_interval`` seconds and
+    tagged with the stream they come from.
+
+    The pipes are always drained, so writers never block. If lines come
+    faster than the session consumes them, only the last ``maxlines``
+    pending lines are kept, and the session's own print buffer is bounded
+    as well.
+
+    Arguments:
+        session: The session to send the lines to.
+        tee: Also write the output to the original file descriptors.
+        flush_interval: Time between two flushes.
+        maxlines: Maximum number of pending lines.
+        maxpartial: Maximum length of an incomplete line.
+    """
+
+    streams = {1: "stdout", 2: "stderr"}
+
+    def __init__(
+        self,
+        session,
+        tee=False,
+        flush_interval=0.05,
+        maxlines=10000,
+        maxpartial=4096,
+    ):
+        self.session = session
+        self.tee = tee
+        self.flush_interval = flush_interval
+        self.maxpartial = maxpartial
+        self.pending = deque(maxlen=maxlines)
+        self.skipped = 0
+        self.partial = {}
+        self.decoders = {}
+        self.saved = {}
+        self.pipes = {}
+        self.thread = None
+
+    def start(self):
+        for fd, stream in self.streams.items():
+            self.saved[fd] = os.dup(fd)
+            r, w = os.pipe()
+            os.dup2(w, fd)
+            os.close(w)
+            self.pipes[r] = fd
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        """Restore the file descriptors and wait for the reader to finish."""
+        if not self.saved:
+            return
+        for f in (sys.stdout, sys.stderr):
+            try:
+                f.flush()
+            except Exception:
+                pass
+        # Restoring the original fds closes the write ends of the pipes,
+        # which the reader sees as the end of the streams
+        for fd, saved in self.saved.items():
+            os.dup2(saved, fd)
+        # Subprocesses may still hold the pipes open
+        self.thread.join(timeout=1)
+        for saved in self.saved.values():
+            os.close(saved)
+        self.saved = {}
+
+    def feed(self, stream, data, final=False):
+        decoder = self.decoders.setdefault(
+            stream, codecs.getincrementaldecoder("utf8")(errors="replace")
+        )
+        text = self.partial.get(stream, "") + decoder.decode(data, final)
+        *lines, rest = text.split("\n")
+        if final and rest or len(rest) > self.maxpartial:
+            lines.append(rest)
+            rest = ""
+        self.partial[stream] = rest
+        for line in lines:
+            if len(self.pending) == self.pending.maxlen:
+                self.skipped += 1
+            # Only show what a terminal would show after carriage returns
+            self.pending.append((stream, line.rstrip("\r").rsplit("\r", 1)[-1]))
+
+    def flush(self):
+        if self.skipped:
+            self.session.print_str(
+                f"[{self.skipped} lines skipped]", stream="info"
+            )
+            self.skipped = 0
+        while self.pending:
+            stream, line = self.pending.popleft()
+            self.session.print_str(line, stream=stream)
+
+    def run(self):
+        sel = selectors.DefaultSelector()
+        for r in self.pipes:
+            sel.register(r, selectors.EVENT_READ, self.pipes[r])
+        last_flush = time.monotonic()
+        try:
+            while sel.get_map():
+                for key, _ in sel.select(timeout=self.flush_interval):
+                    fd = key.data
+                    data = os.read(key.fd, 65536)
+                    if data:
+                        if self.tee:
+                            os.write(self.saved[fd], data)
+                        self.feed(self.streams[fd], data)
+                    else:
+                        self.feed(self.streams[fd], b"", final=True)
+                        sel.unregister(key.fd)
+                        os.close(key.fd)
+                now = time.monotonic()
+                if now - last_flush >= self.flush_interval:
+                    self.flush()
+                    last_flush = now
+        finally:
+            sel.close()
+            self.flush()
@@ -0,0 +1,163 @@
+import json
+from html import escape
+from html.parser import HTMLParser
+
+# Elements that have no end tag
+_void = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+
+# Elements whose contents are not escaped
+_raw = {"script", "style"}
+
+
+###########
+# Parsing #
+###########
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = [None, {}, []]
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        parent = self.stack[-1]
+        if tag == "tr" and parent[0] == "table":
+            # Like the browser, which always puts rows in a tbody
+            tbody = ["tbody", {}, []]
+            parent[2].append(tbody)
+            self.stack.append(tbody)
+            parent = tbody
+        node = [tag, {k: "" if v is None else v for k, v in attrs}, []]
+        parent[2].append(node)
+        if tag not in _void:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _void:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i][0] == tag:
+                del self.stack[i:]
+                break
+
+    def handle_data(self, data):
+        children = self.stack[-1][2]
+        if children and isinstance(children[-1], str):
+            children[-1] += data
+        else:
+            children.append(data)
+
+
+def parse_html(text):
+    """Parse HTML into a tree of [tag, attributes, children] lists.
+
+    Text nodes are strings. The root has no tag.
+    """
+    builder = _TreeBuilder()
+    builder.feed(text)
+    builder.close()
+    return builder.root
+
+
+def to_html(node, raw=False):
+    """Serialize a node from parse_html back to HTML."""
+    if isinstance(node, str):
+        return node if raw else escape(node, quote=False)
+    tag, attrs, children = node
+    inner = "".join(to_html(child, raw=tag in _raw) for child in children)
+    if tag is None:
+        return inner
+    attrs = "".join(f' {k}="{escape(v)}"' for k, v in attrs.items())
+    if tag in _void:
+        return f"<{tag}{attrs}>"
+    return f"<{tag}{attrs}>{inner}</{tag}>"
+
+
+###########
+# Diffing #
+###########
+
+
+def _diff(old, new, path, patches):
+    if isinstance(old, str) or isinstance(new, str):
+        if old == new:
+            return
+        elif isinstance(old, str) and isinstance(new, str):
+            patches.append(["text", path, new])
+        else:
+            patches.append(["replace", path, to_html(new)])
+        return
+
+    tag, old_attrs, old_children = old
+    new_tag, new_attrs, new_children = new
+    if tag != new_tag or tag in _raw or "interactor" in new_attrs:
+        # Scripts must be replaced to run again, and interactors to be
+        # created again
+        if old != new:
+            patches.append(["replace", path, to_html(new)])
+        return
+
+    # represents() gives the same objid to the same object, so the objid
+    # of a node only changes if its object does or if its old callback was
+    # dropped by the registry
+    changes = {
+        k: new_attrs.get(k, None)
+        for k in {**old_attrs, **new_attrs}
+        if old_attrs.get(k, None) != new_attrs.get(k, None)
+    }
+    if changes:
+        patches.append(["attrs", path, changes])
+
+    for i, (o, c) in enumerate(zip(old_children, new_children)):
+        _diff(o, c, [*path, i], patches)
+    if len(new_children) > len(old_children):
+        extra = new_children[len(old_children) :]
+        patches.append(["append", path, "".join(map(to_html, extra))])
+    elif len(new_children) < len(old_children):
+        patches.append(["truncate", path, len(new_children)])
+
+
+def diff_trees(old, new):
+    """List the patches that transform tree old into tree new.
+
+    Each patch is [operation, path, argument], where path is the list of
+    child indices leading to the node to patch:
+
+    * ["replace", path, html]: replace the node by html.
+    * ["text", path, text]: set the text of a text node.
+    * ["attrs", path, attrs]: set attributes, or remove those that are None.
+    * ["append", path, html]: append html to the node's children.
+    * ["truncate", path, n]: only keep the first n children of the node.
+    """
+    patches = []
+    _diff(old, new, [], patches)
+    return patches
+
+
+class DOMPatch:
+    """Patches to send to the client, plus the resources they need."""
+
+    def __init__(self, patches, resources=()):
+        self.patches = patches
+        self.resources = list(resources)
+
+    def size(self):
+        return len(json.dumps(self.patches))
@@ -1,5 +1,6 @@
 import ast
 import types
+from collections import deque
 from itertools import product
 from typing import Union
 
@@ -105,6 +106,30 @@ def _probables(self, thing: object, path):
     return set()
 
 
+class _EditorListener:
+    """Single status listener of a recoder, shared by its editors.
+
+    Recoders are cached and shared between editors, so registering each
+    editor on the recoder would keep all of them forever. The editors are
+    held strongly so that their callbacks stay valid, but only the most
+    recent ones are kept.
+    """
+
+    def __init__(self, keep=100):
+        self.editors = deque(maxlen=keep)
+
+    def __call__(self, recoder, status):
+        for editor in list(self.editors):
+            editor.on_status(recoder, status)
+
+
+def _recoder_editors(recoder):
+    for listener in recoder.on_status:
+        if isinstance(listener, _EditorListener):
+            return listener.editors
+    return recoder.on_status.register(_EditorListener()).editors
+
+
 class SnekRecoder(Interactor):
 
     js_constructor = "LiveEditor"
@@ -133,7 +158,7 @@ class SnekRecoder(Interactor):
                 "autofocus": autofocus,
             }
         )
-        self.recoder.on_status.register(self.on_status)
+        _recoder_editors(self.recoder).append(self)
 
     def on_status(self, recoder, status):
         if status == "out-of-sync":
@@ -0,0 +1,193 @@
+import math
+
+from ..utils import Interactor
+
+
+def is_dataframe(cls):
+    """Check if cls is a pandas DataFrame, without importing pandas."""
+    return any(
+        c.__module__.startswith("pandas") and c.__name__ == "DataFrame"
+        for c in getattr(cls, "__mro__", ())
+    )
+
+
+def is_records(xs, min_length=0):
+    """Check if xs looks like a list of dicts, without looking at all of it."""
+    return (
+        isinstance(xs, list)
+        and len(xs) > min_length
+        and isinstance(xs[0], dict)
+        and isinstance(xs[-1], dict)
+    )
+
+
+def _jsonable(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    elif isinstance(value, float):
+        # NaN and infinities are not valid JSON
+        return value if math.isfinite(value) else str(value)
+    else:
+        return str(value)
+
+
+###########
+# Sources #
+###########
+
+
+class FrameSource:
+    """Columnar access to a pandas DataFrame."""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.columns = [str(c) for c in frame.columns]
+        self.dtypes = [str(t) for t in frame.dtypes]
+
+    def __len__(self):
+        return len(self.frame)
+
+    def window(self, positions):
+        sub = self.frame.iloc[positions]
+        return (
+            [_jsonable(x) for x in sub.index.tolist()],
+            [
+                [_jsonable(x) for x in sub.iloc[:, j].tolist()]
+                for j in range(len(self.columns))
+            ],
+        )
+
+    def argsort(self, column, positions):
+        import numpy as np
+
+        values = self.frame.iloc[:, column].to_numpy()
+        if positions is not None:
+            values = values[positions]
+        try:
+            order = np.argsort(values, kind="stable")
+        except TypeError:
+            order = np.argsort(values.astype(str), kind="stable")
+        return order if positions is None else positions[order]
+
+    def search(self, text):
+        import numpy as np
+
+        mask = np.zeros(len(self.frame), dtype=bool)
+        for j in range(len(self.columns)):
+            col = self.frame.iloc[:, j].astype(str)
+            mask |= col.str.contains(text, case=False, regex=False).to_numpy()
+        return np.flatnonzero(mask)
+
+
+class RecordsSource:
+    """Columnar access to a list of dicts."""
+
+    def __init__(self, records, sample=100):
+        self.records = records
+        columns = {}
+        for rec in [*records[:sample], *records[-sample:]]:
+            columns.update(dict.fromkeys(rec))
+        self.keys = list(columns)
+        self.columns = [str(k) for k in self.keys]
+        self.dtypes = [""] * len(self.keys)
+
+    def __len__(self):
+        return len(self.records)
+
+    def window(self, positions):
+        rows = [self.records[i] for i in positions]
+        return (
+            list(positions),
+            [[_jsonable(row.get(k)) for row in rows] for k in self.keys],
+        )
+
+    def argsort(self, column, positions):
+        k = self.keys[column]
+        if positions is None:
+            positions = range(len(self.records))
+
+        def key(i):
+            value = self.records[i].get(k)
+            if isinstance(value, (int, float)):
+                return (value is None, "", value)
+            return (value is None, type(value).__name__, value)
+
+        try:
+            return sorted(positions, key=key)
+        except TypeError:
+            return sorted(positions, key=lambda i: str(self.records[i].get(k)))
+
+    def search(self, text):
+        text = text.lower()
+        return [
+            i
+            for i, rec in enumerate(self.records)
+            if any(text in str(v).lower() for v in rec.values())
+        ]
+
+
+########
+# Grid #
+########
+
+
+class Grid(Interactor):
+    """Scrollable table that fetches the rows it displays from the server.
+
+    Only the columns and the first block of rows are sent initially, and
+    the other blocks are fetched as they are scrolled to. Sorting and
+    filtering are done on the server, which keeps the current ordering
+    of the rows as a list of positions.
+    """
+
+    js_constructor = "Grid"
+    js_source = "/scripts/grid.js"
+
+    def __init__(self, data, block=100):
+        if is_dataframe(type(data)):
+            self.source = FrameSource(data)
+        else:
+            self.source = RecordsSource(data)
+        self.positions = None
+        super().__init__(
+            {
+                "columns": self.source.columns,
+                "dtypes": self.source.dtypes,
+                "nrows": len(self.source),
+                "block": block,
+                "initial": self.py_window(0, block),
+            }
+        )
+        # The callback registry only keeps weak references to methods, but
+        # the grid must live as long as it is displayed
+        self.parameters["py"] = {
+            "window": lambda start, stop: self.py_window(start, stop),
+            "query": lambda sort, ascending, filter: self.py_query(
+                sort, ascending, filter
+            ),
+        }
+
+    def __len__(self):
+        return (
+            len(self.source) if self.positions is None else len(self.positions)
+        )
+
+    def py_window(self, start, stop):
+        """Return rows start to stop, encoded column by column."""
+        stop = min(stop, len(self))
+        if self.positions is None:
+            positions = range(start, stop)
+        else:
+            positions = self.positions[start:stop]
+        index, columns = self.source.window(list(positions))
+        return {"start": start, "index": index, "columns": columns}
+
+    def py_query(self, sort=None, ascending=True, filter=""):
+        """Filter and sort the rows, and return the new number of rows."""
+        positions = self.source.search(filter) if filter else None
+        if sort is not None:
+            positions = self.source.argsort(sort, positions)
+            if not ascending:
+                positions = positions[::-1]
+        self.positions = positions
+        return len(self)
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from hrepr import hrepr
+
+from ..registry import callback_registry
+from ..session import current_session
+from ..utils import Interactor
+
+
+class LogPanel(Interactor):
+    """Display log records, with filters on their level and logger."""
+
+    js_constructor = "LogPanel"
+    js_source = "/scripts/logs.js"
+
+    def __init__(self, maxlen=5000):
+        super().__init__({"maxlen": maxlen})
+
+
+class SnekLogHandler(logging.Handler):
+    """Logging handler that sends records to a LogPanel in batches.
+
+    Records are formatted when they are emitted, so that their message
+    reflects the state of their arguments at that time, and are sent every
+    ``flush_interval`` seconds by a background thread. Each logger may
+    emit ``rate`` records per second on average, with bursts of up to
+    ``burst`` records; the others are counted and dropped.
+
+    Arguments:
+        session: The session to send the records to.
+        level: Minimum level of the records.
+        flush_interval: Time between two batches.
+        rate: Records per second allowed for each logger.
+        burst: Number of records a logger may emit at once.
+        maxpending: Maximum number of records waiting to be sent.
+    """
+
+    def __init__(
+        self,
+        session=None,
+        level=logging.NOTSET,
+        flush_interval=0.2,
+        rate=100,
+        burst=1000,
+        maxpending=10000,
+    ):
+        super().__init__(level)
+        self.session = session or current_session()
+        self.flush_interval = flush_interval
+        self.rate = rate
+        self.burst = burst
+        self.pending = deque(maxlen=maxpending)
+        self.buckets = {}
+        self.dropped = {}
+        self.panel = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def emit(self, record):
+        # Token bucket per logger. Handler.handle holds the lock, so there
+        # is no race on the buckets.
+        name = record.name
+        now = record.created
+        tokens, last = self.buckets.get(name, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self.dropped[name] = self.dropped.get(name, 0) + 1
+            self.buckets[name] = (tokens, now)
+        else:
+            self.buckets[name] = (tokens - 1, now)
+            self.pending.append(self.entry(record))
+
+    def entry(self, record):
+        try:
+            message = record.getMessage()
+        except Exception as exc:
+            message = f"{record.msg!r} (could not format: {exc})"
+        exc = None
+        if record.exc_info and record.exc_info[1] is not None:
+            error = record.exc_info[1]
+            exc = callback_registry.register(lambda *_: hrepr(error))
+        return {
+            "level": record.levelname,
+            "levelno": record.levelno,
+            "name": record.name,
+            "time": record.created,
+            "message": message,
+            "exc": exc,
+        }
+
+    def send_pending(self):
+        entries = []
+        while True:
+            try:
+                entries.append(self.pending.popleft())
+            except IndexError:
+                break
+        with self.lock:
+            dropped, self.dropped = self.dropped, {}
+        for name, n in dropped.items():
+            entries.append(
+                {
+                    "level": "WARNING",
+                    "levelno": logging.WARNING,
+                    "name": name,
+                    "time": time.time(),
+                    "message": f"[{n} records dropped by the rate limit]",
+                    "exc": None,
+                }
+            )
+        if not entries:
+            return
+        with self.session.set_context():
+            if self.panel is None:
+                self.panel = LogPanel.show()
+            self.panel.js.add(entries)
+
+    def run(self):
+        while not self.stopped.wait(self.flush_interval):
+            try:
+                self.send_pending()
+            except Exception:
+                # Reporting this through logging could make it worse
+                pass
+
+    def close(self):
+        """Stop the flush thread and send the remaining records."""
+        self.stopped.set()
+        if self.thread is not threading.current_thread():
+            self.thread.join()
+        try:
+            self.send_pending()
+        except Exception:
+            pass
+        super().close()
+
+
+def capture_logs(logger=None, level=logging.NOTSET, **kwargs):
+    """Send the records of a logger to the current session.
+
+    Arguments:
+        logger: The logger or the name of the logger to capture,
+            defaults to the root logger.
+        level: Minimum level of the records.
+        kwargs: Other arguments to SnekLogHandler.
+    """
+    if not isinstance(logger, logging.Logger):
+        logger = logging.getLogger(logger)
+    session = kwargs.pop("session", None) or current_session()
+    for handler in logger.handlers:
+        if isinstance(handler, SnekLogHandler) and handler.session is session:
+            # Already captured, only update the level
+            handler.setLevel(level)
+            break
+    else:
+        handler = SnekLogHandler(session=session, level=level, **kwargs)
+        logger.addHandler(handler)
+    if level and (not logger.level or logger.level > level):
+        logger.setLevel(level)
+    return handler
@@ -0,0 +1,125 @@
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+
+from hrepr import H
+
+from ..session import current_session
+from ..utils import pastecode
+from .progress import Progress
+
+_executors = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+########
+# pmap #
+########
+
+
+class PmapFailure:
+    """Stands in for the result of an item for which fn raised an error."""
+
+    def __init__(self, item, exception):
+        self.item = item
+        self.exception = exception
+
+    @property
+    def exc_info(self):
+        exc = self.exception
+        return (type(exc), exc, exc.__traceback__)
+
+    def debug(self, *_):
+        sess = current_session()
+        sess.blt["$$exc_info"] = self.exc_info
+        pastecode("/debug")
+
+    def __bool__(self):
+        return False
+
+    def __hrepr__(self, H, hrepr):
+        return H.div["snek-pmap-failure"](
+            H.div["snek-title-row"](
+                H.span("Failed on ", hrepr(self.item)),
+                H.span["snek-button"]("debug", onclick=self.debug),
+            ),
+            hrepr(self.exception),
+        )
+
+
+def _outcome(item, future):
+    try:
+        return future.result()
+    except Exception as exc:
+        return PmapFailure(item, exc)
+
+
+def pmap(
+    fn,
+    iterable,
+    workers=None,
+    backend="thread",
+    ordered=True,
+    progress=True,
+    throttle=0.1,
+):
+    """Map fn over iterable in parallel.
+
+    All items are submitted immediately and a generator over the results
+    is returned. If fn raises on an item, a PmapFailure is yielded in its
+    stead, which can be clicked to debug the error with /debug.
+
+    Arguments:
+        fn: The function to apply.
+        iterable: The items to apply fn to.
+        workers: Maximum number of concurrent workers.
+        backend: "thread" or "process".
+        ordered: Yield the results in the order of the items if True,
+            else as they are completed.
+        progress: Display a live progress bar.
+        throttle: Minimum time between two updates of the progress bar.
+    """
+    if backend not in _executors:
+        raise ValueError(
+            f"backend must be one of {', '.join(_executors)}, not {backend!r}"
+        )
+    items = list(iterable)
+    prog = Progress(
+        total=len(items),
+        desc=getattr(fn, "__name__", ""),
+        mininterval=throttle,
+        disable=not progress,
+    )
+
+    def done(future):
+        if future.cancelled():
+            return
+        prog.tick(failed=future.exception() is not None)
+        if prog.n == prog.total:
+            prog.close()
+
+    executor = _executors[backend](max_workers=workers)
+    futures = {}
+    for item in items:
+        future = executor.submit(fn, item)
+        future.add_done_callback(done)
+        futures[future] = item
+    # Pending futures still run, but the workers go away once done
+    executor.shutdown(wait=False)
+    if not items:
+        prog.close()
+
+    def results():
+        try:
+            for future in futures if ordered else as_completed(futures):
+                yield _outcome(futures[future], future)
+        finally:
+            for future in futures:
+                future.cancel()
+            prog.close()
+
+    return results()
@@ -0,0 +1,514 @@
+import cProfile
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from itertools import count
+from types import CodeType
+
+from hrepr import H
+
+from ..registry import callback_registry
+from ..utils import Interactor, format_libpath
+from ..version import version
+from .edit import edit
+
+_count = count(1)
+
+
+#############
+# Call tree #
+#############
+
+
+class CallNode:
+    """Node of an aggregated call tree.
+
+    Attributes:
+        key: A code object, or a string for builtins.
+        time: Total time (or weight) spent in this node and its children.
+        children: Dictionary of key -> CallNode.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.time = 0.0
+        self.children = {}
+
+    def child(self, key):
+        if key not in self.children:
+            self.children[key] = CallNode(key)
+        return self.children[key]
+
+    @property
+    def name(self):
+        if isinstance(self.key, CodeType):
+            return getattr(self.key, "co_qualname", self.key.co_name)
+        else:
+            return str(self.key)
+
+    @property
+    def filename(self):
+        if isinstance(self.key, CodeType):
+            return self.key.co_filename
+        else:
+            return None
+
+    @property
+    def lineno(self):
+        if isinstance(self.key, CodeType):
+            return self.key.co_firstlineno
+        else:
+            return None
+
+    @property
+    def self_time(self):
+        return max(
+            0.0, self.time - sum(c.time for c in self.children.values())
+        )
+
+    def add_stack(self, stack, weight=1.0):
+        """Add weight to the path of keys given by stack, outermost first."""
+        node = self
+        node.time += weight
+        for key in stack:
+            node = node.child(key)
+            node.time += weight
+
+    def walk(self, stack=()):
+        stack = (*stack, self)
+        yield stack
+        for child in self.children.values():
+            yield from child.walk(stack)
+
+
+def tree_from_cprofile(profiler, root=None, threshold=0.001, max_depth=200):
+    """Build a CallNode tree from a cProfile.Profile.
+
+    cProfile only records caller/callee pairs, so the time of a callee
+    is split between its callers proportionally to the time each of them
+    spent calling it, as most flamegraph tools for cProfile do.
+
+    Arguments:
+        profiler: The cProfile.Profile to convert.
+        root: Predicate on code objects to select the roots of the tree.
+            Roots that are called from another root, e.g. a nested REPL,
+            are only counted under that root. By default, the roots are
+            the functions that have no callers.
+        threshold: Subtrees smaller than this fraction of the total time
+            are dropped.
+        max_depth: Maximal depth of the tree.
+    """
+    stats = profiler.getstats()
+    entries = {entry.code: entry for entry in stats}
+    roots = [entry for entry in stats if root and root(entry.code)]
+    if len(roots) > 1:
+        roots = _outermost(roots, entries) or roots
+    if not roots:
+        callees = {sub.code for entry in stats for sub in entry.calls or ()}
+        roots = [entry for entry in stats if entry.code not in callees]
+
+    tree = CallNode("<profile>")
+    tree.time = sum(entry.totaltime for entry in roots)
+    cutoff = tree.time * threshold
+
+    def fill(node, entry, scale, path):
+        if len(path) >= max_depth:
+            return
+        for sub in entry.calls or ():
+            t = sub.totaltime * scale
+            if t <= cutoff:
+                continue
+            child = node.child(sub.code)
+            child.time += t
+            sub_entry = entries.get(sub.code, None)
+            if (
+                sub.code not in path
+                and sub_entry is not None
+                and sub_entry.totaltime > 0
+            ):
+                fill(
+                    child,
+                    sub_entry,
+                    t / sub_entry.totaltime,
+                    path | {sub.code},
+                )
+
+    for entry in roots:
+        node = tree.child(entry.code)
+        node.time += entry.totaltime
+        fill(node, entry, 1.0, {entry.code})
+
+    return tree
+
+
+def _outermost(roots, entries):
+    """Filter out the roots that are reachable from another root."""
+    codes = {entry.code for entry in roots}
+    nested = set()
+    for entry in roots:
+        seen = set()
+        todo = [entry]
+        while todo:
+            for sub in todo.pop().calls or ():
+                if sub.code not in seen:
+                    seen.add(sub.code)
+                    if sub.code in entries:
+                        todo.append(entries[sub.code])
+        nested |= (seen & codes) - {entry.code}
+    return [entry for entry in roots if entry.code not in nested]
+
+
+def speedscope(tree, name="profile"):
+    """Convert a CallNode tree to the speedscope file format."""
+    frames = []
+    index = {}
+    samples = []
+    weights = []
+
+    def frame_id(node):
+        if node.key not in index:
+            index[node.key] = len(frames)
+            frame = {"name": node.name}
+            if node.filename is not None:
+                frame["file"] = node.filename
+                frame["line"] = node.lineno
+            frames.append(frame)
+        return index[node.key]
+
+    for stack in tree.walk():
+        *_, node = stack
+        if node is tree:
+            continue
+        if (weight := node.self_time) > 0:
+            samples.append([frame_id(n) for n in stack[1:]])
+            weights.append(weight)
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+        "name": name,
+        "exporter": f"snektalk@{version}",
+    }
+
+
+###########
+# Profile #
+###########
+
+
+class Profile:
+    """Result of running some code under cProfile."""
+
+    def __init__(
+        self, profiler, tree, name="profile", result=None, export_dir=None
+    ):
+        self.profiler = profiler
+        self.tree = tree
+        self.name = name
+        self.result = result
+        self.export_dir = export_dir
+        self.flamegraph = None
+
+    def dump_stats(self, filename):
+        """Save the profile in the pstats format."""
+        self.profiler.dump_stats(filename)
+        return filename
+
+    def dump_speedscope(self, filename):
+        """Save the profile in the speedscope format."""
+        with open(filename, "w") as f:
+            json.dump(speedscope(self.tree, name=self.name), f)
+        return filename
+
+    def __hrepr__(self, H, hrepr):
+        if self.flamegraph is None:
+            self.flamegraph = Flamegraph(self.tree, profile=self)
+        return hrepr(self.flamegraph)
+
+
+def profile_call(fn, name="profile", root=None, export_dir=None):
+    """Call fn under cProfile and return a Profile.
+
+    The flamegraph's exports are written to export_dir, or to the
+    temporary directory by default.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = fn()
+    finally:
+        profiler.disable()
+    tree = tree_from_cprofile(profiler, root=root)
+    return Profile(
+        profiler, tree, name=name, result=result, export_dir=export_dir
+    )
+
+
+##############
+# Flamegraph #
+##############
+
+
+def show_editor(code):
+    ed = edit(code, autofocus=True)
+    if ed is None:
+        raise Exception(f"Could not find the source code for {code.co_name}")
+    print(ed)
+
+
+class Flamegraph(Interactor):
+
+    js_constructor = "Flamegraph"
+    js_source = "/scripts/flamegraph.js"
+
+    def __init__(self, tree, profile=None, unit="s"):
+        self.profile = profile
+        self.nodes = []
+        super().__init__(
+            {
+                "tree": self._serialize(tree),
+                "unit": unit,
+                "exports": ["pstats", "speedscope"] if profile else [],
+            }
+        )
+
+    def _serialize(self, node):
+        self.nodes.append(node)
+        filename = node.filename
+        return {
+            "id": len(self.nodes) - 1,
+            "name": node.name,
+            "location": filename
+            and f"{format_libpath(filename)}:{node.lineno}",
+            "time": node.time,
+            "editable": isinstance(node.key, CodeType),
+            "children": [
+                self._serialize(child)
+                for child in sorted(
+                    node.children.values(), key=lambda c: -c.time
+                )
+            ],
+        }
+
+    def py_edit(self, node_id):
+        show_editor(self.nodes[node_id].key)
+
+    def py_export(self, format):
+        n = next(_count)
+        directory = self.profile.export_dir or tempfile.gettempdir()
+        if format == "pstats":
+            filename = os.path.join(directory, f"snektalk-profile-{n}.prof")
+            self.profile.dump_stats(filename)
+        elif format == "speedscope":
+            filename = os.path.join(
+                directory, f"snektalk-profile-{n}.speedscope.json"
+            )
+            self.profile.dump_speedscope(filename)
+        else:
+            raise ValueError(f"Unknown profile format: {format}")
+        return format_libpath(os.path.abspath(filename))
+
+
+###########
+# Sampler #
+###########
+
+
+_here = os.path.dirname(os.path.dirname(__file__))
+
+
+class SampleTarget:
+    """Samples collected for one thread.
+
+    The thread may be a threading.Thread, or a job of NamedThreads, in
+    which case only the frames of the worker that run the job are
+    sampled, and only while it runs it.
+    """
+
+    def __init__(self, name, thread, session):
+        self.name = name
+        self.thread = thread
+        self.finished = False
+        self.session = session
+        self.tree = CallNode(f"<thread {name}>")
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+        self.nsamples = 0
+        self.divid = f"$sample__{next(_count)}"
+        self._edit_ids = {}
+
+    @property
+    def ident(self):
+        """Ident of the thread to sample, or None."""
+        if isinstance(self.thread, threading.Thread):
+            return self.thread.ident
+        worker = self.thread.thread
+        if worker is None or worker.job is not self.thread:
+            return None
+        return worker.ident
+
+    def done(self):
+        if isinstance(self.thread, threading.Thread):
+            return not self.thread.is_alive()
+        return self.thread.done()
+
+    def add(self, frame):
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        stack.reverse()
+        # Drop the outer frames that belong to threading or snektalk
+        while stack and (
+            stack[0].co_filename == threading.__file__
+            or stack[0].co_filename.startswith(_here)
+        ):
+            stack.pop(0)
+        if not stack:
+            return
+        self.tree.add_stack(stack)
+        self.self_counts[stack[-1]] += 1
+        self.total_counts.update(set(stack))
+        self.nsamples += 1
+
+    def _edit_id(self, code):
+        if code not in self._edit_ids:
+            self._edit_ids[code] = callback_registry.register(
+                lambda *_: show_editor(code)
+            )
+        return self._edit_ids[code]
+
+    def top(self, n=15):
+        """Return the top n functions by self time."""
+        total = self.nsamples or 1
+        return [
+            (code, count / total, self.total_counts[code] / total)
+            for code, count in self.self_counts.most_common(n)
+        ]
+
+    def view(self):
+        rows = [
+            H.tr(
+                H.td(
+                    getattr(code, "co_qualname", code.co_name),
+                    onclick=f"$$SKTK({self._edit_id(code)})",
+                    title=(
+                        f"{format_libpath(code.co_filename)}"
+                        f":{code.co_firstlineno}"
+                    ),
+                ),
+                H.td(f"{100 * own:.1f}%"),
+                H.td(f"{100 * total:.1f}%"),
+            )
+            for code, own, total in self.top()
+        ]
+        return H.div["snek-sample-view"](
+            H.div["snek-title-row"](
+                H.span(
+                    "Sampled thread " if self.finished else "Sampling thread ",
+                    H.strong(self.name),
+                ),
+                H.span(
+                    f"{self.nsamples} samples",
+                    " (thread finished)" if self.finished else "",
+                ),
+            ),
+            H.table["snek-sample-table"](
+                H.tr(H.th("function"), H.th("self"), H.th("total")), *rows,
+            ),
+            id=self.divid,
+        )
+
+    def refresh(self):
+        if self.session is not None:
+            self.session.queue(
+                command="fill", value=self.view(), target=self.divid
+            )
+
+
+class Sampler:
+    """Statistical profiler for running threads.
+
+    A single daemon thread looks at the stacks of all target threads via
+    sys._current_frames() every ``interval`` seconds. If taking a sample
+    costs more than ``max_overhead`` of the wall time, the interval is
+    stretched accordingly. Targets whose thread or job is finished stop
+    being sampled, but can still be stopped to get their samples.
+    """
+
+    def __init__(self, interval=0.01, refresh=1.0, max_overhead=0.02):
+        self.interval = interval
+        self.refresh = refresh
+        self.max_overhead = max_overhead
+        self.targets = {}
+        self.finished = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self, name, thread, session):
+        with self.lock:
+            if name in self.targets:
+                raise Exception(f"Thread {name} is already being sampled")
+            self.finished.pop(name, None)
+            target = SampleTarget(name, thread, session)
+            self.targets[name] = target
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        return target
+
+    def stop(self, name):
+        with self.lock:
+            if name in self.finished:
+                return self.finished.pop(name)
+            if name not in self.targets:
+                raise Exception(f"Thread {name} is not being sampled")
+            return self.targets.pop(name)
+
+    def sample(self):
+        frames = sys._current_frames()
+        for name, target in list(self.targets.items()):
+            if target.done():
+                del self.targets[name]
+                self.finished[name] = target
+                target.finished = True
+                target.refresh()
+                continue
+            frame = frames.get(target.ident, None)
+            if frame is not None:
+                target.add(frame)
+
+    def run(self):
+        last_refresh = time.monotonic()
+        while True:
+            t0 = time.perf_counter()
+            with self.lock:
+                if not self.targets:
+                    self.thread = None
+                    return
+                self.sample()
+                now = time.monotonic()
+                if now - last_refresh >= self.refresh:
+                    last_refresh = now
+                    for target in self.targets.values():
+                        target.refresh()
+            cost = time.perf_counter() - t0
+            time.sleep(max(self.interval, cost / self.max_overhead))
+
+
+sampler = Sampler()
@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import deque
+
+from ..session import current_print_session
+from ..utils import Interactor
+
+
+class ProgressBar(Interactor):
+
+    js_constructor = "ProgressBar"
+    js_source = "/scripts/progress.js"
+
+    def __init__(self, state):
+        super().__init__({"state": state})
+
+
+class Progress:
+    """Progress bar with the common interface of tqdm.
+
+    It can wrap an iterable, or be updated manually with ``update``. The
+    bar is refreshed at most once every ``mininterval`` seconds, plus once
+    when ``close`` is called, and it shows the average time per iteration
+    between refreshes as a sparkline.
+
+    ``tick`` counts successes and failures and can be called from any
+    thread.
+
+    Arguments:
+        iterable: The iterable to wrap.
+        desc: Description shown before the bar.
+        total: Expected number of iterations, defaults to len(iterable).
+        leave: Keep the bar after it is closed.
+        unit: Name of an iteration.
+        mininterval: Minimum time between two refreshes of the bar.
+        disable: Do not display the bar.
+        initial: Initial value of the counter.
+        postfix: Additional text or dict to show after the stats.
+        kwargs: Other tqdm options, which are ignored.
+    """
+
+    def __init__(
+        self,
+        iterable=None,
+        desc=None,
+        total=None,
+        leave=True,
+        unit="it",
+        mininterval=0.1,
+        disable=False,
+        initial=0,
+        postfix=None,
+        **kwargs,
+    ):
+        if total is None and hasattr(iterable, "__len__"):
+            total = len(iterable)
+        self.iterable = iterable
+        self.desc = desc or ""
+        self.total = total
+        self.leave = leave
+        self.unit = unit
+        self.mininterval = mininterval
+        self.disable = disable
+        self.n = initial
+        self.failures = 0
+        self.postfix = ""
+        self.closed = False
+        self.history = deque(maxlen=50)
+        self.lock = threading.Lock()
+        self.bar = None
+        self._reset_time()
+        if postfix is not None:
+            self._set_postfix(postfix)
+        if not disable:
+            self.show()
+
+    def _reset_time(self):
+        self.start = time.monotonic()
+        self.last_update = self.start
+        self.last_n = self.n
+
+    def state(self):
+        elapsed = time.monotonic() - self.start
+        rate = self.n / elapsed if elapsed > 0 else None
+        eta = (
+            (self.total - self.n) / rate
+            if rate and self.total is not None
+            else None
+        )
+        return {
+            "desc": self.desc,
+            "unit": self.unit,
+            "n": self.n,
+            "total": self.total,
+            "failures": self.failures,
+            "elapsed": elapsed,
+            "rate": rate,
+            "eta": eta,
+            "postfix": self.postfix,
+            "history": list(self.history),
+            "closed": self.closed,
+            "leave": self.leave,
+        }
+
+    def show(self):
+        if current_print_session() is not None:
+            self.bar = ProgressBar.show(self.state())
+        return self
+
+    def _due(self, now):
+        """Record the time per iteration since the last refresh, and refresh."""
+        dn = self.n - self.last_n
+        if dn > 0:
+            self.history.append((now - self.last_update) / dn)
+        self.last_update = now
+        self.last_n = self.n
+        self.refresh()
+
+    def refresh(self):
+        """Send the current state to the bar."""
+        if self.bar:
+            self.bar.js.update(self.state())
+
+    ############
+    # Counting #
+    ############
+
+    def __iter__(self):
+        # The time is only checked once per iteration, and the counter is
+        # kept in a local until a refresh is due
+        monotonic = time.monotonic
+        mininterval = self.mininterval
+        last = self.last_update
+        n = self.n
+        try:
+            for x in self.iterable:
+                yield x
+                n += 1
+                now = monotonic()
+                if now - last >= mininterval:
+                    self.n = n
+                    self._due(now)
+                    last = now
+        finally:
+            self.n = n
+            self.close()
+
+    def update(self, n=1):
+        """Increment the counter by n."""
+        self.n += n
+        now = time.monotonic()
+        if now - self.last_update >= self.mininterval:
+            self._due(now)
+
+    def tick(self, n=1, failed=False):
+        """Increment the counter by n, from any thread."""
+        with self.lock:
+            if failed:
+                self.failures += n
+            self.update(n)
+
+    def close(self):
+        with self.lock:
+            if not self.closed:
+                self.closed = True
+                self.refresh()
+
+    def reset(self, total=None):
+        """Reset the counter to zero, with a new total if given."""
+        self.n = 0
+        self.failures = 0
+        self.history.clear()
+        if total is not None:
+            self.total = total
+        self._reset_time()
+        self.refresh()
+
+    ###########
+    # Display #
+    ###########
+
+    def set_description(self, desc=None, refresh=True):
+        self.desc = desc or ""
+        if refresh:
+            self.refresh()
+
+    set_description_str = set_description
+
+    def _set_postfix(self, postfix):
+        if isinstance(postfix, dict):
+            postfix = ", ".join(f"{k}={v}" for k, v in postfix.items())
+        self.postfix = str(postfix)
+
+    def set_postfix(self, ordered_dict=None, refresh=True, **kwargs):
+        self._set_postfix({**(ordered_dict or {}), **kwargs})
+        if refresh:
+            self.refresh()
+
+    def set_postfix_str(self, s="", refresh=True):
+        self._set_postfix(s)
+        if refresh:
+            self.refresh()
+
+    def clear(self, nolock=False):
+        pass
+
+    def display(self, msg=None, pos=None):
+        self.refresh()
+
+    @classmethod
+    def write(cls, s, file=None, end="\n", nolock=False):
+        print(s, file=file, end=end)
+
+    def __len__(self):
+        if self.total is not None:
+            return self.total
+        return len(self.iterable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
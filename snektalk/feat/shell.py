@@ -0,0 +1,135 @@
+import codecs
+import os
+import selectors
+import signal
+import subprocess
+import time
+from collections import deque
+from itertools import count
+
+from hrepr import H
+
+_count = count(1)
+
+
+class ShellStream:
+    """Forward the output of a process to a single element, line by line.
+
+    Only the lines that have not been sent yet are kept in memory and at
+    most ``maxlines`` of them are sent per flush. The client keeps at most
+    ``maxlines`` lines in the element.
+    """
+
+    def __init__(self, session, maxlines=1000, maxpartial=4096):
+        self.session = session
+        self.maxlines = maxlines
+        self.maxpartial = maxpartial
+        self.divid = f"$shell__{next(_count)}"
+        self.pending = deque(maxlen=maxlines)
+        self.skipped = 0
+        self.partial = {}
+        self.decoders = {}
+
+    def element(self):
+        return H.div["snek-shellout"](id=self.divid)
+
+    def feed(self, stream, data, final=False):
+        decoder = self.decoders.setdefault(
+            stream, codecs.getincrementaldecoder("utf8")(errors="replace")
+        )
+        text = self.partial.get(stream, "") + decoder.decode(data, final)
+        *lines, rest = text.split("\n")
+        if final and rest or len(rest) > self.maxpartial:
+            lines.append(rest)
+            rest = ""
+        self.partial[stream] = rest
+        for line in lines:
+            self.line(line, stream)
+
+    def line(self, text, stream="stdout"):
+        if len(self.pending) == self.pending.maxlen:
+            self.skipped += 1
+        self.pending.append((stream, text))
+
+    def flush(self):
+        if not self.pending and not self.skipped:
+            return
+        lines = []
+        if self.skipped:
+            lines.append(
+                H.div["snek-shellinfo"](f"[{self.skipped} lines skipped]")
+            )
+            self.skipped = 0
+        for stream, line in self.pending:
+            lines.append(H.div[f"snek-shell{stream}"](line))
+        self.pending.clear()
+        self.session.queue(
+            command="insert",
+            value=H.inline(*lines),
+            target=self.divid,
+            maxlen=self.maxlines,
+        )
+
+
+def _killpg(proc, sig):
+    try:
+        os.killpg(proc.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def run_shell(cmd, session, flush_interval=0.05, maxlines=1000):
+    """Run a shell command, streaming its output into the session.
+
+    The command can be interrupted like any other evaluation, in which
+    case the process is terminated.
+    """
+    out = ShellStream(session, maxlines=maxlines)
+    session.queue_result(out.element(), type="expression")
+
+    proc = subprocess.Popen(
+        cmd,
+        shell=True,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        # The shell and its children get their own process group, so that
+        # they can all be terminated together
+        start_new_session=True,
+    )
+    sel = selectors.DefaultSelector()
+    sel.register(proc.stdout, selectors.EVENT_READ, "stdout")
+    sel.register(proc.stderr, selectors.EVENT_READ, "stderr")
+    last_flush = time.monotonic()
+    try:
+        while sel.get_map():
+            for key, _ in sel.select(timeout=flush_interval):
+                data = os.read(key.fd, 65536)
+                if data:
+                    out.feed(key.data, data)
+                else:
+                    out.feed(key.data, b"", final=True)
+                    sel.unregister(key.fileobj)
+            now = time.monotonic()
+            if now - last_flush >= flush_interval:
+                out.flush()
+                last_flush = now
+        returncode = proc.wait()
+        if returncode != 0:
+            out.line(f"[exit status {returncode}]", stream="info")
+
+    finally:
+        sel.close()
+        if proc.poll() is None:
+            _killpg(proc, signal.SIGTERM)
+            try:
+                proc.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                _killpg(proc, signal.SIGKILL)
+                proc.wait()
+            out.line("[terminated]", stream="info")
+        proc.stdout.close()
+        proc.stderr.close()
+        out.flush()
+
+    return returncode
@@ -0,0 +1,206 @@
+import asyncio
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextvars import copy_context
+from io import IOBase
+from itertools import count
+
+from hrepr import H, hrepr
+
+from ..registry import callback_registry
+from ..session import current_session
+
+_c = count()
+
+
+def is_stream(cls):
+    """Check if cls is an iterator or async iterator type.
+
+    Files are iterators too, but they are not displayed as streams.
+    """
+    return issubclass(cls, (Iterator, AsyncIterator)) and not issubclass(
+        cls, IOBase
+    )
+
+
+def consumes(obj):
+    """Check if rendering obj pulls items from an iterator.
+
+    Such objects must only be rendered once, since rendering them again
+    would lose the items that were pulled the first time.
+    """
+    return isinstance(obj, Stream) or is_stream(type(obj))
+
+
+def _spawn(fn):
+    thread = threading.Thread(
+        target=copy_context().run, args=(fn,), daemon=True
+    )
+    thread.start()
+    return thread
+
+
+class Stream:
+    """Pull-based view of an iterator or async iterator.
+
+    The first page of items is pulled when the stream is displayed, and
+    the next pages are pulled when requested. In live mode, a background
+    thread pulls items until the stream is paused or exhausted, and sends
+    them at most once every ``throttle`` seconds. Items are not kept once
+    displayed, and the client only keeps the last ``maxlen``.
+
+    Arguments:
+        it: The iterator or async iterator.
+        pagesize: Number of items to pull per page.
+        throttle: Minimum time between two updates in live mode.
+        maxlen: Maximum number of items to keep on display.
+    """
+
+    def __init__(self, it, pagesize=20, throttle=0.1, maxlen=1000):
+        self.it = it
+        self.pagesize = pagesize
+        self.throttle = throttle
+        self.maxlen = maxlen
+        self.count = 0
+        self.done = False
+        self.error = None
+        self.live = False
+        self.lock = threading.Lock()
+        self.loop = None
+        n = next(_c)
+        self.items_id = f"$stream__items{n}"
+        self.controls_id = f"$stream__controls{n}"
+        # The closures keep the stream alive as long as it is displayed
+        self.callbacks = {
+            name: callback_registry.register(fn)
+            for name, fn in {
+                "next": lambda *_: self.next_page(),
+                "start": lambda *_: self.start(),
+                "pause": lambda *_: self.pause(),
+            }.items()
+        }
+
+    def _next(self):
+        if not isinstance(self.it, AsyncIterator):
+            return next(self.it)
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+        try:
+            return self.loop.run_until_complete(self.it.__anext__())
+        except StopAsyncIteration:
+            raise StopIteration
+
+    def pull(self, n):
+        """Pull up to n items, fewer if the iterator is exhausted."""
+        items = []
+        with self.lock:
+            while len(items) < n and not self.done:
+                try:
+                    items.append(self._next())
+                except StopIteration:
+                    self.done = True
+                except Exception as exc:
+                    self.done = True
+                    self.error = exc
+            start = self.count
+            self.count += len(items)
+            if self.done and self.loop is not None:
+                self.loop.close()
+                self.loop = None
+        return start, items
+
+    ##########
+    # Render #
+    ##########
+
+    def rows(self, start, items, hrepr=hrepr):
+        return [
+            H.div["snek-stream-item"](
+                H.span["snek-stream-index"](str(i)), hrepr(item)
+            )
+            for i, item in enumerate(items, start)
+        ]
+
+    def button(self, text, name):
+        return H.span["snek-button"](
+            text, onclick=f"$$SKTK({self.callbacks[name]})"
+        )
+
+    def controls(self, hrepr=hrepr):
+        if self.done:
+            rval = H.div(
+                H.span["snek-note"](f"end of stream, {self.count} items")
+            )
+            if self.error is not None:
+                rval = rval(hrepr(self.error))
+            return rval
+        elif self.live:
+            return H.div(
+                H.span["snek-note"](f"streaming, {self.count} items "),
+                self.button("pause", "pause"),
+            )
+        else:
+            return H.div(
+                self.button(f"next {self.pagesize}", "next"),
+                self.button("stream", "start"),
+            )
+
+    def send(self, start, items):
+        sess = current_session()
+        if items:
+            sess.queue(
+                command="insert",
+                value=H.div(*self.rows(start, items)),
+                target=self.items_id,
+                maxlen=self.maxlen,
+            )
+        sess.queue(
+            command="fill", value=self.controls(), target=self.controls_id
+        )
+
+    def __hrepr__(self, H, hrepr):
+        start, items = self.pull(self.pagesize)
+        return H.div["snek-stream"](
+            H.div["snek-stream-title"](type(self.it).__name__),
+            H.div["snek-stream-items"](
+                *self.rows(start, items, hrepr), id=self.items_id
+            ),
+            H.div["snek-stream-controls"](
+                self.controls(hrepr), id=self.controls_id
+            ),
+        )
+
+    #############
+    # Callbacks #
+    #############
+
+    def next_page(self):
+        _spawn(lambda: self.send(*self.pull(self.pagesize)))
+
+    def start(self):
+        if self.live or self.done:
+            return
+        self.live = True
+        self.send(self.count, [])
+
+        def run():
+            batch_start, batch = self.count, []
+            last = time.monotonic()
+            while self.live and not self.done:
+                start, items = self.pull(1)
+                if not batch:
+                    batch_start = start
+                batch += items
+                now = time.monotonic()
+                if now - last >= self.throttle:
+                    self.send(batch_start, batch)
+                    batch = []
+                    last = now
+            self.live = False
+            self.send(batch_start, batch)
+
+        _spawn(run)
+
+    def pause(self):
+        self.live = False
@@ -1,4 +1,5 @@
 import builtins
+import inspect
 import os
 from types import SimpleNamespace
 
@@ -8,8 +9,21 @@ from hrepr.std import _extract_as
 
 from .debug import SnekTalkDb
 from .feat.edit import edit
+from .feat.grid import Grid
+from .feat.logs import capture_logs
+from .feat.pmap import pmap
+from .feat.progress import Progress
+from .feat.streams import Stream
+from .registry import callback_registry
 from .repr import SnekTalkHrepr
-from .session import current_print_session, current_session
+from .session import (
+    RenderTimeout,
+    current_print_session,
+    current_session,
+    is_rendering,
+    rendering,
+    run_with_timeout,
+)
 from .utils import Importer, mod, pastevar, represents, sktk_hjson
 
 ##################
@@ -42,7 +56,15 @@ def snekprint(*args, toplevel=False, to=None, **kwargs):
         )
     else:
         if all(isinstance(arg, str) for arg in args):
-            html = H.div["snek-print-str"](" ".join(args))
+            sess.print_str(" ".join(args))
+            return
+        elif len(args) == 1 and not kwargs:
+            (arg,) = args
+            html = sess.render_cached(
+                arg,
+                lambda: hrepr(arg) if toplevel else hrepr(PrintSequence(args)),
+                namespace="print/toplevel" if toplevel else "print",
+            )
         elif toplevel:
             html = hrepr(*args, **kwargs)
         else:
@@ -52,14 +74,39 @@ def snekprint(*args, toplevel=False, to=None, **kwargs):
         )
 
 
-def snekprint_override(*args, toplevel=False, file=None, std=False, **kwargs):
-    builtins.print = orig_print
+def snekprint_override(
+    *args,
+    sep=" ",
+    end="\n",
+    file=None,
+    flush=False,
+    toplevel=False,
+    std=False,
+    **kwargs,
+):
     sess = current_print_session()
     if sess is None or std or file is not None:
-        orig_print(*args, file=file, **kwargs)
-    else:
+        orig_print(*args, sep=sep, end=end, file=file, flush=flush)
+        return
+
+    if is_rendering():
+        # Print from within hrepr, e.g. in a __hrepr__ method, including
+        # in the threads that render with a timeout
+        orig_print(*args, sep=sep, end=end, flush=flush)
+        return
+
+    if not toplevel and not kwargs:
+        for arg in args:
+            if type(arg) is not str:
+                break
+        else:
+            # Fast path: plain strings skip hrepr and are sent in batches
+            text = " ".join(args) if sep is None else sep.join(args)
+            sess.print_str(text, end="\n" if end is None else end)
+            return
+
+    with rendering():
         snekprint(*args, toplevel=toplevel, **kwargs)
-    builtins.print = snekprint_override
 
 
 def insert_at(target, value, index=None, **kwargs):
@@ -68,10 +115,10 @@ def insert_at(target, value, index=None, **kwargs):
     sess.queue(command="insert", value=html, target=target, index=index)
 
 
-def fill_at(target, value, **kwargs):
+def fill_at(target, value, patch=False, **kwargs):
     html = hrepr(value, **kwargs)
     sess = current_session()
-    sess.queue(command="fill", value=html, target=target)
+    sess.fill(target, html, patch=patch)
 
 
 def clear_at(target):
@@ -85,25 +132,76 @@ def help_placeholder(*args, **kwargs):
     )
 
 
+def attribute_kind(obj, name):
+    """Describe obj.name without evaluating it, using getattr_static."""
+    try:
+        static = inspect.getattr_static(obj, name)
+    except AttributeError:
+        # Provided by __getattr__ or similar
+        return "dynamic"
+    if isinstance(static, property):
+        return "property"
+    elif isinstance(static, (classmethod, staticmethod)):
+        return type(static).__name__
+    elif inspect.isroutine(static):
+        return "method"
+    elif hasattr(type(static), "__get__"):
+        return "descriptor"
+    else:
+        return type(static).__name__
+
+
 class HDir:
+    """List the attributes of obj, without evaluating them.
+
+    Each value is only evaluated and rendered when its row is clicked, in
+    at most ``timeout`` seconds.
+    """
+
     exclusions = {"__doc__", "__dict__"}
 
-    def __init__(self, obj):
+    def __init__(self, obj, timeout=1.0):
         self.obj = obj
+        self.timeout = timeout
 
-    def items(self):
-        for k in dir(self.obj):
-            if k in self.exclusions:
-                continue
+    def names(self):
+        return [k for k in dir(self.obj) if k not in self.exclusions]
+
+    def value(self, name, **hrepr_options):
+        def render():
             try:
-                v = getattr(self.obj, k)
+                v = getattr(self.obj, name)
             except Exception as e:
                 v = e
-            yield (k, v)
+            return hrepr(v, **hrepr_options)
+
+        try:
+            return run_with_timeout(render, self.timeout)
+        except RenderTimeout:
+            return H.span["snek-note"](f"timed out after {self.timeout}s")
 
     def __hrepr__(self, H, hrepr):
-        return H.table["hrepr-body"](
-            *[H.tr(H.td(k), H.td(" = ", hrepr(v))) for k, v in self.items()]
+        # A single callback for all rows, which takes the attribute name,
+        # so that large objects do not evict other callbacks
+        method_id = callback_registry.register(
+            lambda name: self.value(name, max_depth=2)
+        )
+        return H.table["hrepr-body", "snek-hdir"](
+            *[
+                H.tr(
+                    H.td(k),
+                    H.td["snek-hdir-kind"](attribute_kind(self.obj, k)),
+                    H.td(
+                        H.div["snek-lazy"](
+                            "...",
+                            lazyid=method_id,
+                            lazytrigger="click",
+                            lazyarg=k,
+                        )
+                    ),
+                )
+                for k in self.names()
+            ]
         )
 
 
@@ -129,7 +227,9 @@ def wrap_onclick(elem, obj, hrepr):
 
 
 sktk = SimpleNamespace(
+    capture_logs=capture_logs,
     edit=edit,
+    grid=Grid,
     help=None,
     imp=Importer(),
     mod=mod,
@@ -137,6 +237,9 @@ sktk = SimpleNamespace(
     insert_at=insert_at,
     clear_at=clear_at,
     pastevar=pastevar,
+    pmap=pmap,
+    progress=Progress,
+    stream=Stream,
 )
 
 
@@ -1,13 +1,25 @@
 import os
+import sys
+import threading
 import types
+import weakref
+from collections import OrderedDict
+from functools import partial
+from itertools import islice
 from types import FunctionType, MethodType, ModuleType
 from typing import Union
 
 from hrepr import H
-from ovld import OvldBase, extend_super
+from jurigged import make_recoder, registry
+from jurigged.codetools import CodeFileOperation
+from ovld import OvldBase, extend_super, meta
 
-from .feat.edit import edit
-from .utils import format_libpath, join, represents
+from .feat.arrays import array_hrepr, array_summary, is_ndarray
+from .feat.cache import callback_ids, resolvable
+from .feat.edit import SnekRecoder, edit
+from .feat.grid import Grid, is_dataframe, is_records
+from .feat.streams import Stream, is_stream
+from .utils import PagedView, format_libpath, join, lazy, represents
 
 here = os.path.dirname(__file__)
 
@@ -16,7 +28,289 @@ def shortname(obj):
     return getattr(obj, "__name__", f"<{type(obj).__name__}>")
 
 
+###############
+# Frame cache #
+###############
+
+
+class FrameInfo:
+    """Rendering data for the frames of a code object in tracebacks."""
+
+    def __init__(self, code):
+        self.code = code
+        self.filename = code.co_filename
+        self.location = format_libpath(self.filename)
+        if self.filename.startswith(os.getcwd()) or self.filename.startswith(
+            "<"
+        ):
+            self.importance_class = "snek-exception-local"
+        else:
+            self.importance_class = "snek-exception-lib"
+        self.titles = {}
+        self._recoder = None
+        self._found = False
+
+    @property
+    def recoder(self):
+        # make_recoder locates and parses the source, so only do it once
+        if not self._found:
+            try:
+                self._recoder = make_recoder(self.code)
+            except Exception:
+                self._recoder = None
+            self._found = True
+        return self._recoder
+
+    def title(self, lineno):
+        if lineno not in self.titles:
+            self.titles[lineno] = H.div[
+                "snek-title-row", self.importance_class
+            ](H.span(self.code.co_name), H.span(f"{self.location}:{lineno}"))
+        return self.titles[lineno]
+
+
+class FrameCache:
+    """Cache of FrameInfo, keyed by code object.
+
+    The entries for a file are dropped whenever jurigged reports that a
+    definition in that file was added, updated or deleted.
+    """
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        registry.activity.register(self._on_activity)
+
+    def _on_activity(self, event):
+        if isinstance(event, CodeFileOperation):
+            self.invalidate(event.codefile.filename)
+
+    def invalidate(self, filename=None):
+        with self.lock:
+            for key, info in list(self.entries.items()):
+                if filename is None or info.filename == filename:
+                    del self.entries[key]
+
+    def get(self, code):
+        with self.lock:
+            # The entry holds a reference to the code, so the id is not reused
+            info = self.entries.get(id(code), None)
+            if info is None:
+                info = FrameInfo(code)
+                self.entries[id(code)] = info
+                if len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+            else:
+                self.entries.move_to_end(id(code))
+            return info
+
+
+frame_cache = FrameCache()
+
+
+def frame_source(code, lineno):
+    recoder = frame_cache.get(code).recoder
+    if recoder is None:
+        return H.span("Could not find source")
+    hl = lineno - code.co_firstlineno
+    return SnekRecoder(recoder, code, code_highlight=hl, max_height=19 * 7)
+
+
+##################
+# Module members #
+##################
+
+
+class ModuleMembers:
+    """Some of the members of a module, for one page of its PagedView."""
+
+    def __init__(self, module, names):
+        self.module = module
+        self.names = names
+
+    def __hrepr__(self, H, hrepr):
+        members = vars(self.module)
+        return H.div["snek-module-members"](
+            *[
+                H.div["snek-module-member"](
+                    represents(members[name], H.span(name)),
+                    " = ",
+                    hrepr(members[name], max_depth=2),
+                    snek_key=name,
+                )
+                for name in self.names
+                if name in members
+            ]
+        )
+
+
+#################
+# Class members #
+#################
+
+
+class ClassMembersCache:
+    """Rendered members of classes, keyed by class.
+
+    The rows of a class are rendered again when its __dict__ changes or
+    when the callbacks they embed were dropped by the callback registry,
+    and they are dropped when jurigged reports a change in the file that
+    defines the class.
+    """
+
+    exclusions = {"__dict__", "__module__", "__weakref__", "__doc__"}
+
+    def __init__(self):
+        self.entries = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+        registry.activity.register(self._on_activity)
+
+    def _on_activity(self, event):
+        if isinstance(event, CodeFileOperation):
+            filename = event.codefile.filename
+            with self.lock:
+                for cls in list(self.entries.keys()):
+                    module = sys.modules.get(cls.__module__, None)
+                    if getattr(module, "__file__", None) == filename:
+                        del self.entries[cls]
+
+    def rows(self, cls, hrepr):
+        """Return a sorted list of (name, cells) for the members of cls.
+
+        The cells are the rendered owner, name and value of the member.
+        """
+        members = vars(cls)
+        signature = [(name, id(value)) for name, value in members.items()]
+        with self.lock:
+            entry = self.entries.get(cls, None)
+        if entry is not None and entry[0] == signature and resolvable(entry[2]):
+            return entry[1]
+
+        clselem = represents(cls, hrepr.H.span(cls.__qualname__))
+        rows = [
+            (
+                name,
+                (
+                    clselem,
+                    represents(value, hrepr.H.span(name)),
+                    # References would not make sense in another render
+                    hrepr(value, norefs=True),
+                ),
+            )
+            for name, value in sorted(members.items())
+            if name not in self.exclusions
+        ]
+        callbacks = callback_ids(
+            "".join(str(cell) for _, cells in rows for cell in cells)
+        )
+        with self.lock:
+            self.entries[cls] = (signature, rows, callbacks)
+        return rows
+
+
+class_cache = ClassMembersCache()
+
+
+def member_row(cells, css_class):
+    clselem, nameelem, valueelem = cells
+    return H.tr(
+        H.td[css_class](clselem, "."), H.td(nameelem), H.td("= ", valueelem),
+    )
+
+
+class InheritedMembers:
+    """Members of cls that are not overriden by a subclass."""
+
+    def __init__(self, cls, hidden=frozenset()):
+        self.cls = cls
+        self.hidden = hidden
+
+    def __hrepr__(self, H, hrepr):
+        return H.table["hrepr-body"](
+            *[
+                member_row(cells, "snek-clsname")
+                for name, cells in class_cache.rows(self.cls, hrepr)
+                if name not in self.hidden
+            ]
+        )
+
+
+#############
+# Sequences #
+#############
+
+
+def _iter_from(seq, start):
+    if start and isinstance(seq, (list, tuple, range)):
+        return (seq[i] for i in range(start, len(seq)))
+    else:
+        return islice(seq, start, None)
+
+
+class SequencePage:
+    """The elements of seq from index start on, as many as the budget allows."""
+
+    def __init__(self, seq, start, pairs=False):
+        self.seq = seq
+        self.start = start
+        self.pairs = pairs
+
+    def __hrepr__(self, H, hrepr):
+        if self.pairs:
+            transform = lambda kv: H.pair(  # noqa: E731
+                hrepr(kv[0]), hrepr(kv[1]), delimiter=": "
+            )
+        else:
+            transform = hrepr
+        elems = hrepr.take(self.seq, transform, self.start, pairs=self.pairs)
+        return H.div["snek-more-page"](*[H.div(x) for x in elems])
+
+
+#########
+# Hrepr #
+#########
+
+
 class SnekTalkHrepr(OvldBase):
+    def budget_exhausted(self):
+        max_nodes = self.config.max_nodes
+        return (
+            max_nodes is not None
+            and getattr(self.state, "nodes", 0) >= max_nodes
+        )
+
+    def more(self, seq, start, pairs=False):
+        """Ellipsis that loads the elements of seq after start on click."""
+        if hasattr(seq, "__len__"):
+            text = f"... {len(seq) - start} more"
+        else:
+            text = "... more"
+        page = SequencePage(seq, start, pairs=pairs)
+        return lazy(
+            lambda: page,
+            placeholder=text,
+            trigger="click",
+            max_nodes=self.config.max_nodes,
+            max_depth=self.config.max_depth,
+        )["snek-more"]
+
+    def take(self, seq, transform, start=0, pairs=False):
+        """Transform the elements of seq from start, within the budget.
+
+        At most sequence_max elements are transformed, fewer if the
+        max_nodes budget runs out, followed by an ellipsis to load more.
+        """
+        cap = self.config.sequence_max
+        results = []
+        for i, x in enumerate(_iter_from(seq, start)):
+            if (cap and i >= cap) or self.budget_exhausted():
+                results.append(self.more(seq, start + i, pairs=pairs))
+                break
+            self.state.nodes = getattr(self.state, "nodes", 0) + 1
+            results.append(transform(x))
+        return results
+
     def collapsible(self, title, body, start_visible=False):
         body = self.H.div(self(body))
         if not start_visible:
@@ -46,38 +340,79 @@ class SnekTalkHrepr(OvldBase):
         while curr:
             fr = curr.tb_frame
             code = fr.f_code
-            filename = code.co_filename
-            if filename.startswith(here) and skipping:
+            if code.co_filename.startswith(here) and skipping:
                 curr = curr.tb_next
                 continue
             skipping = False
-            if filename.startswith(os.getcwd()) or filename.startswith("<"):
-                importance_class = "snek-exception-local"
-            else:
-                importance_class = "snek-exception-lib"
-
-            hl = curr.tb_lineno - code.co_firstlineno
-            try:
-                ed = edit(code, code_highlight=hl, max_height=19 * 7)
-            except Exception as exc:
-                ed = None
             parts.append(
                 self.collapsible(
-                    self.H.div["snek-title-row", importance_class](
-                        self.H.span(code.co_name),
-                        self.H.span(
-                            f"{format_libpath(filename)}:{fr.f_lineno}"
-                        ),
-                    ),
-                    self(ed)
-                    if ed is not None
-                    else self.H.span("Could not find source"),
+                    frame_cache.get(code).title(fr.f_lineno),
+                    lazy(partial(frame_source, code, curr.tb_lineno)),
                 )
             )
             curr = curr.tb_next
 
         return self.H.div["hrepr-body"](*parts, exc_proper)
 
+    def hrepr(self, xs: list):  # noqa: F811
+        if self.state.depth == 0 and is_records(xs, self.config.sequence_max):
+            return self(Grid(xs))
+        return self.H.bracketed(
+            self.take(xs, self), start="[", end="]", type=type(xs).__name__,
+        )
+
+    def hrepr(self, xs: tuple):  # noqa: F811
+        return self.H.bracketed(
+            self.take(xs, self), start="(", end=")", type=type(xs).__name__,
+        )
+
+    def hrepr(self, xs: Union[set, frozenset]):  # noqa: F811
+        return self.H.bracketed(
+            self.take(xs, self), start="{", end="}", type=type(xs).__name__,
+        )
+
+    def hrepr(self, obj: dict):  # noqa: F811
+        return self.H.bracketed(
+            self.take(
+                obj.items(),
+                lambda kv: self.H.pair(
+                    self(kv[0]), self(kv[1]), delimiter=": "
+                ),
+                pairs=True,
+            ),
+            type="dict",
+            start="{",
+            end="}",
+            vertical=True,
+        )
+
+    def hrepr(self, arr: meta(is_ndarray)):  # noqa: F811
+        if self.state.depth == 0:
+            return self.H.instance(
+                array_hrepr(arr, self.H), type="ndarray", vertical=True
+            )
+        else:
+            return NotImplemented
+
+    @extend_super
+    def hrepr_short(self, arr: meta(is_ndarray)):  # noqa: F811
+        return self.H.defn("ndarray", array_summary(arr))
+
+    def hrepr(self, df: meta(is_dataframe)):  # noqa: F811
+        if self.state.depth == 0:
+            return self(Grid(df))
+        else:
+            return NotImplemented
+
+    def hrepr_short(self, df: meta(is_dataframe)):  # noqa: F811
+        return self.H.defn("DataFrame", "×".join(map(str, df.shape)))
+
+    def hrepr(self, it: meta(is_stream)):  # noqa: F811
+        if self.state.depth == 0:
+            return self(Stream(it))
+        else:
+            return NotImplemented
+
     def hrepr(self, r: range):  # noqa: F811
         rval = self.H.instance(self(r.start), self(r.stop), type="range")
         if r.step != 1:
@@ -129,17 +464,10 @@ class SnekTalkHrepr(OvldBase):
             "__author__",
         }
         if self.state.depth == 0:
+            names = sorted(name for name in vars(mod) if name not in exclusions)
             return self.H.instance(
                 self.H.pre(mod.__doc__.strip()) if mod.__doc__ else "",
-                *[
-                    self.H.pair(
-                        represents(value, self.H.span(name)),
-                        self(value, max_depth=2),
-                        delimiter="=",
-                    )
-                    for name, value in sorted(vars(mod).items())
-                    if name not in exclusions
-                ],
+                self(PagedView(names, lambda names: ModuleMembers(mod, names))),
                 type=self.H.span(
                     self.H.span["snek-block-type"]("module "), mod.__name__
                 ),
@@ -152,29 +480,11 @@ class SnekTalkHrepr(OvldBase):
         if self.state.depth > 0:
             return NotImplemented
 
-        exclusions = {"__dict__", "__module__", "__weakref__", "__doc__"}
-
         # Exclude the object type to reduce noise
         mro = list(type.mro(cls))[:-1]
-
-        rows = {}
-        clselems = []
-        for cls2 in mro:
-            clsname = cls2.__qualname__
-            clselem = represents(cls2, self.H.span(clsname))
-            clselems.append(clselem)
-            for name, value in vars(cls2).items():
-                if name not in rows and name not in exclusions:
-                    rows[name] = (
-                        name,
-                        clsname,
-                        clselem,
-                        represents(value, self.H.span(name)),
-                        value,
-                    )
-
-        rows = list(rows.values())
-        rows.sort(key=lambda row: row[0])
+        clselems = [
+            represents(cls2, self.H.span(cls2.__qualname__)) for cls2 in mro
+        ]
 
         tbl = self.H.table["hrepr-body"]()
 
@@ -182,25 +492,33 @@ class SnekTalkHrepr(OvldBase):
         if doc:
             tbl = tbl(self.H.tr(self.H.td(self.H.pre(doc), colspan=3)))
 
-        for _, clsname, clselem, nameelem, value in rows:
-            css_class = (
-                "snek-clsname-principal"
-                if clsname == cls.__name__
-                else "snek-clsname"
-            )
-            tbl = tbl(
-                self.H.tr(
-                    self.H.td[css_class](clselem, "."),
-                    self.H.td(nameelem),
-                    self.H.td("= ", self(value)),
+        seen = set()
+        for name, cells in class_cache.rows(cls, self):
+            seen.add(name)
+            tbl = tbl(member_row(cells, "snek-clsname-principal"))
+
+        # Inherited members are only rendered when their section is opened
+        sections = []
+        for cls2, clselem in zip(mro[1:], clselems[1:]):
+            names = set(vars(cls2)) - class_cache.exclusions
+            n = len(names - seen)
+            if n:
+                sections.append(
+                    self.collapsible(
+                        self.H.div["snek-title-row", "snek-inherited"](
+                            self.H.span("inherited from ", clselem),
+                            self.H.span(f"{n} member{'s' if n > 1 else ''}"),
+                        ),
+                        lazy(partial(InheritedMembers, cls2, frozenset(seen))),
+                    )
                 )
-            )
+            seen |= names
 
         title = self.H.span(
             self.H.span["snek-block-type"]("class "), *join(clselems, " > ")
         )
 
-        return self.H.instance(tbl, type=title, vertical=True)
+        return self.H.instance(tbl, *sections, type=title, vertical=True)
 
     @extend_super
     def hrepr_short(self, clsm: Union[classmethod, staticmethod]):  # noqa: F811
@@ -7,16 +7,20 @@ import json
 import os
 import random
 import re
+import sys
 import threading
 import traceback
-from collections import defaultdict, deque
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import CancelledError
 from contextlib import contextmanager
-from contextvars import ContextVar
-from itertools import count
+from contextvars import ContextVar, copy_context
+from itertools import count, islice
 
 from hrepr import H, Tag, hrepr
 
 from .config import mayread, maywrite
+from .feat.cache import CachedHTML, RenderCache
+from .feat.dom import DOMPatch, diff_trees, parse_html
 from .fzf import fuzzyfinder
 from .registry import callback_registry
 
@@ -59,6 +63,67 @@ def kill_thread(thread, exctype=ThreadKilledException):
     )
 
 
+class RenderTimeout(Exception):
+    def __init__(self, message="Rendering timed out", frame=None):
+        super().__init__(message)
+        # Frame the rendering thread was in when it timed out
+        self.frame = frame
+
+
+# Methods through which objects render themselves
+_render_methods = {"__hrepr__", "__hrepr_short__", "__repr__", "__str__"}
+
+# Types that always render quickly, without a thread
+_fast_types = {int, float, complex, bool, str, bytes, type(None)}
+
+
+def slow_render_type(frame):
+    """Return the type whose own rendering method was running in frame.
+
+    Builtin types, such as containers that were rendering a slow element
+    or generators, are never returned.
+    """
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name in _render_methods and "self" in frame.f_locals:
+            typ = type(frame.f_locals["self"])
+            if typ.__module__ != "builtins":
+                return typ
+        frame = frame.f_back
+    return None
+
+
+def run_with_timeout(fn, timeout):
+    """Run fn in a separate thread and wait at most timeout seconds.
+
+    If fn takes too long, the thread is sent a RenderTimeout exception
+    and RenderTimeout is raised.
+    """
+    if timeout is None:
+        return fn()
+
+    ctx = copy_context()
+    box = {}
+
+    def target():
+        try:
+            box["result"] = ctx.run(fn)
+        except BaseException as exc:
+            box["error"] = exc
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        frame = sys._current_frames().get(thread.ident, None)
+        kill_thread(thread, RenderTimeout)
+        raise RenderTimeout(f"Rendering took more than {timeout}s", frame)
+    elif "error" in box:
+        raise box["error"]
+    else:
+        return box["result"]
+
+
 class KillableThread(threading.Thread):
     @property
     def dead(self):
@@ -67,16 +132,128 @@ class KillableThread(threading.Thread):
     kill = kill_thread
 
 
+class Job:
+    """Future-like handle on a function submitted to NamedThreads.
+
+    The status of a job is one of "queued", "running", "done", "failed",
+    "killed" or "cancelled".
+    """
+
+    def __init__(self, name, fn, session, pool, recycle_name=False):
+        self.name = name
+        self.fn = fn
+        self.session = session
+        self.pool = pool
+        self.recycle_name = recycle_name
+        self.status = "queued"
+        self._released = False
+        self.thread = None
+        self._result = None
+        self._exception = None
+        self._done = threading.Event()
+
+    @property
+    def ident(self):
+        return self.thread and self.thread.ident
+
+    @property
+    def dead(self):
+        return self._done.is_set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """Wait for the job to finish and return its result.
+
+        The exception raised by the job, if any, is raised again.
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Job {self.name} is not done")
+        if self.status == "cancelled":
+            raise CancelledError(f"Job {self.name} was cancelled")
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Job {self.name} is not done")
+        return self._exception
+
+    def kill(self, exctype=ThreadKilledException):
+        if self.status == "queued":
+            self.pool.cancel(self)
+        elif self.status == "running" and self.thread.job is self:
+            kill_thread(self.thread, exctype)
+
+    def _finish(self, status, result=None, exception=None):
+        self.status = status
+        self._result = result
+        self._exception = exception
+        self._done.set()
+
+    def _cleanup(self):
+        # This must be safe to call twice, in case a kill interrupts it
+        if not self._done.is_set():
+            self._finish("killed")
+        if not self._released:
+            self._released = True
+            self.session._clean_owners()
+            self.pool.release(self)
+
+    def run(self):
+        session = self.session
+        reason = " finished"
+        with session.set_context():
+            with new_evalid():
+                try:
+                    session.queue_result(
+                        H.div("Starting thread ", H.strong(self.name)),
+                        type="info",
+                    )
+                    self._finish("done", result=self.fn())
+                except ThreadKilledException as exc:
+                    reason = " killed"
+                    self._finish("killed", exception=exc)
+                except Exception as exc:
+                    self._finish("failed", exception=exc)
+                    session.queue_result(exc, type="exception")
+                finally:
+                    self._cleanup()
+                    session.queue_result(
+                        H.div("Thread ", H.strong(self.name), reason),
+                        type="info",
+                    )
+
+    def __hrepr__(self, H, hrepr):
+        rval = H.instance(
+            H.span["snek-job-status", f"snek-job-{self.status}"](self.status),
+            type=f"job {self.name}",
+        )
+        if self.status == "done" and self._result is not None:
+            rval = rval(hrepr(self._result))
+        elif self._exception is not None:
+            rval = rval(hrepr(self._exception))
+        return rval
+
+
 class NamedThreads:
+    """Pool of worker threads that run jobs with mnemonic names.
+
+    At most ``max_workers`` jobs run at the same time, the others wait in
+    a queue. Idle workers exit after ``idle_timeout`` seconds.
+    """
+
     @classmethod
     def current(cls):
         thread = threading.current_thread()
         if isinstance(thread, KillableThread):
-            return thread
+            return thread.job
         else:
             return None
 
-    def __init__(self):
+    def __init__(self, max_workers=None, idle_timeout=60, history=100):
         self.words = [
             word
             for word in open(
@@ -87,48 +264,95 @@ class NamedThreads:
             if word
         ]
         random.shuffle(self.words)
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.idle_timeout = idle_timeout
+        # Queued and running jobs, by name
         self.threads = {}
+        # Recent jobs, including finished ones
+        self.history = deque(maxlen=history)
+        self.queue = deque()
+        self.workers = []
+        self.idle = 0
         self.count = count(1)
+        self.cond = threading.Condition()
 
-    def run_in_thread(self, fn, session):
-        def run():
-            reason = " finished"
-            self.threads[word] = thread
-            with session.set_context():
-                with new_evalid():
-                    session.queue_result(
-                        H.div("Starting thread ", H.strong(word)), type="info",
-                    )
-                    try:
-                        fn()
-                    except ThreadKilledException:
-                        reason = " killed"
-                    except Exception as e:
-                        session.queue_result(e, type="exception")
-                    finally:
-                        thread._dead = True
-                        session._clean_owners()
-                        del self.threads[word]
-                        self.words.append(word)
-                        session.queue_result(
-                            H.div("Thread ", H.strong(word), reason),
-                            type="info",
-                        )
-
-        thread = KillableThread(target=run, daemon=True)
-
-        if not self.words:
-            self.words.append(f"t{next(self.count)}")
-        word = self.words.pop()
-
-        thread.start()
-        return word, thread
+    def _worker(self):
+        thread = threading.current_thread()
+        while True:
+            try:
+                with self.cond:
+                    while not self.queue:
+                        self.idle += 1
+                        woken = self.cond.wait(self.idle_timeout)
+                        self.idle -= 1
+                        if not woken and not self.queue:
+                            self.workers.remove(thread)
+                            return
+                    job = self.queue.popleft()
+                    job.thread = thread
+                    job.status = "running"
+                    thread.job = job
+                job.run()
+            except (ThreadKilledException, SnektalkInterrupt):
+                # A kill that arrived before the job could finish or clean
+                # up, or after it was finished
+                job = thread.job
+                if job is not None:
+                    job._cleanup()
+            finally:
+                thread.job = None
+
+    def cancel(self, job):
+        with self.cond:
+            if job in self.queue:
+                self.queue.remove(job)
+                job._finish("cancelled")
+                self.release(job)
+
+    def release(self, job):
+        del self.threads[job.name]
+        if job.recycle_name:
+            self.words.append(job.name)
+
+    def run_in_thread(self, fn, session, name=None):
+        with self.cond:
+            recycle_name = name is None
+            if recycle_name:
+                if not self.words:
+                    self.words.append(f"t{next(self.count)}")
+                name = self.words.pop()
+            elif name in self.threads:
+                raise Exception(f"There is already a thread named {name}")
+            job = Job(name, fn, session, self, recycle_name=recycle_name)
+            self.threads[name] = job
+            self.history.append(job)
+            self.queue.append(job)
+            # Idle workers only stop counting as idle once they wake up, so
+            # the queue may already hold jobs for some of them
+            if len(self.queue) <= self.idle:
+                self.cond.notify()
+            elif len(self.workers) < self.max_workers:
+                thread = KillableThread(target=self._worker, daemon=True)
+                thread.job = None
+                self.workers.append(thread)
+                thread.start()
+            else:
+                session.queue_result(
+                    H.div(
+                        "Thread ",
+                        H.strong(name),
+                        f" is queued ({len(self.queue)} waiting)",
+                    ),
+                    type="info",
+                )
+        return job
 
 
 threads = NamedThreads()
 _current_session = ContextVar("current_session", default=None)
 _current_print_session = ContextVar("current_print_session", default=None)
 _current_evalid = ContextVar("current_evalid", default=None)
+_rendering = ContextVar("rendering", default=False)
 
 
 def current_session():
@@ -139,6 +363,24 @@ def current_print_session():
     return _current_print_session.get()
 
 
+def is_rendering():
+    """Check if an object is being rendered in the current context.
+
+    This is also true in the threads that render with a timeout, since
+    they run in a copy of the context.
+    """
+    return _rendering.get()
+
+
+@contextmanager
+def rendering():
+    token = _rendering.set(True)
+    try:
+        yield
+    finally:
+        _rendering.reset(token)
+
+
 @contextmanager
 def new_evalid():
     token = _current_evalid.set(next(_c))
@@ -170,6 +412,16 @@ class Lib:
                 {"text": name} for name, thread in threads.threads.items()
             ]
 
+    def method_resync(self, target):
+        # The client could not apply a patch, so it needs the whole HTML
+        _, text = self.session.dom_trees.get(target, (None, None))
+        if text is not None:
+            self.session.queue(command="fill", value=text, target=target)
+
+    def method_search_log(self, logid, query):
+        log = self.session.logs.get(logid, None)
+        return [] if log is None else log.search(query)
+
     def export(self):
         if self._export:
             return self._export
@@ -184,6 +436,27 @@ class Lib:
         return rval
 
 
+class PrintLog:
+    """Lines printed in a row by an evaluation, kept for searching."""
+
+    def __init__(self, id, evalid, maxlen=100_000):
+        self.id = id
+        self.evalid = evalid
+        self.count = 0
+        self.lines = deque(maxlen=maxlen)
+
+    def extend(self, lines):
+        self.lines.extend(enumerate(lines, self.count + 1))
+        self.count += len(lines)
+
+    def search(self, query, limit=100):
+        query = query.lower()
+        matches = (
+            [i, line] for i, line in self.lines if query in line.lower()
+        )
+        return list(islice(matches, limit))
+
+
 class History:
     def __init__(self, history_file):
         self.history_file = history_file
@@ -234,7 +507,13 @@ class History:
 
 
 class Session:
-    def __init__(self, socket=None, history_file=None, restart_command=None):
+    def __init__(
+        self,
+        socket=None,
+        history_file=None,
+        restart_command=None,
+        render_cache=False,
+    ):
         self.tempkeep = deque(maxlen=10)
         self.lib = Lib(self)
         self.blt = vars(builtins)
@@ -260,6 +539,25 @@ class Session:
                 "/kill[ \n]?(.*)": self.submit_command_kill,
             }
         )
+        self.render_budget = {
+            "max_nodes": 10000,
+            "max_depth": 20,
+            "max_bytes": 5_000_000,
+            "timeout": 2.0,
+        }
+        self.slow_types = set()
+        self.render_cache = RenderCache() if render_cache else None
+        self.sent_html = set()
+        # Lines that come faster than they are sent are dropped and counted
+        self.print_buffer = deque(maxlen=10000)
+        self.print_skipped = 0
+        # Text printed with an end other than a newline
+        self.print_partial = ""
+        self.print_scheduled = False
+        self.print_lock = threading.Lock()
+        self.logs = OrderedDict()
+        self.current_log = None
+        self.dom_trees = OrderedDict()
         self._token = None
         self._tokenp = None
 
@@ -342,12 +640,104 @@ class Session:
         self.blt[varname] = obj
         return varname
 
+    def render(self, result, budget):
+        with rendering():
+            return self._render(result, budget)
+
+    def _render(self, result, budget):
+        from .feat.streams import consumes
+
+        budget = dict(budget)
+        max_bytes = budget.pop("max_bytes")
+        html = hrepr(result, **budget)
+        size = len(str(html))
+        if size > max_bytes and consumes(result):
+            # Rendering again would pull and lose another page, and the
+            # size of a page is bounded anyway
+            return html
+        elif size > max_bytes:
+            # Try again with a smaller budget, proportional to the excess
+            budget["max_nodes"] = budget["max_nodes"] * max_bytes // size
+            html = hrepr(result, **budget)
+            if len(str(html)) > max_bytes:
+                html = H.div(
+                    hrepr(result, max_depth=0),
+                    H.span["snek-note"](" (representation too large)"),
+                )
+        return html
+
+    def render_placeholder(self, result):
+        """Cheap placeholder for a result that is too slow to render."""
+        divid = f"$render__{next(_c)}"
+        budget = dict(self.render_budget)
+        budget.pop("timeout")
+
+        def render():
+            try:
+                html = self.render(result, budget)
+            except Exception as exc:
+                html = hrepr(exc)
+            self.queue(command="fill", value=html, target=divid)
+
+        def render_anyway(*_):
+            thread = threading.Thread(
+                target=copy_context().run, args=(render,), daemon=True
+            )
+            thread.start()
+
+        method_id = callback_registry.register(render_anyway)
+        return H.div["snek-render-timeout"](
+            H.span(f"<{type(result).__qualname__} at {hex(id(result))}>"),
+            H.span["snek-note"](" is slow to render"),
+            H.span["snek-button"](
+                "render anyway", onclick=f"$$SKTK({method_id})"
+            ),
+            id=divid,
+        )
+
+    def render_cached(self, obj, render, namespace=""):
+        """Call render() to render obj, unless it was rendered already.
+
+        This only uses the cache if the session was created with
+        render_cache=True.
+        """
+        if self.render_cache is None:
+            return render()
+        html = self.render_cache.get(obj, render, namespace=namespace)
+        evicted = self.render_cache.pop_evicted()
+        if evicted:
+            self.queue(command="uncache", keys=evicted)
+        return html
+
     def represent(self, typ, result):
+        from .feat.streams import consumes
+
         if isinstance(result, Tag):
             return typ, result
 
+        budget = dict(self.render_budget)
+        timeout = budget.pop("timeout")
+        rtype = builtins.type(result)
+        if rtype in self.slow_types:
+            return typ, self.render_placeholder(result)
+        if rtype in _fast_types or consumes(result):
+            # Streams only pull one page, and killing the thread would
+            # break the iterator
+            timeout = None
+
         try:
-            html = hrepr(result)
+            html = self.render_cached(
+                result,
+                lambda: run_with_timeout(
+                    lambda: self.render(result, budget), timeout
+                ),
+            )
+        except RenderTimeout as exc:
+            # Do not even try to render the culprit type in the future
+            slow = slow_render_type(exc.frame)
+            if slow is not None:
+                self.slow_types.add(slow)
+            html = self.render_placeholder(result)
         except Exception as exc:
             try:
                 html = hrepr(exc)
@@ -409,6 +799,8 @@ class Session:
         self.loop = asyncio.get_running_loop()
         self.socket = socket
         self.sent_resources = set()
+        self.sent_html = set()
+        self.dom_trees.clear()
         while self.out_queue:
             self.schedule(self.send(**self.out_queue.popleft()))
         self.queue(command="set_lib", lib=self.lib.export())
@@ -423,10 +815,25 @@ class Session:
         """
         if process:
             resources = []
-            for k, v in command.items():
-                if isinstance(v, Tag):
+            for k, v in list(command.items()):
+                if isinstance(v, DOMPatch):
+                    resources.extend(v.resources)
+                    command[k] = v.patches
+                elif isinstance(v, CachedHTML):
+                    if v.key in self.sent_html:
+                        # The client already has this HTML
+                        command[k] = None
+                        command["cached"] = v.key
+                    else:
+                        resources.extend(v.resources)
+                        command[k] = v.text
+                        command["cache_key"] = v.key
+                        self.sent_html.add(v.key)
+                elif isinstance(v, Tag):
                     resources.extend(v.collect_resources())
                     command[k] = str(v)
+            if command.get("command", None) == "uncache":
+                self.sent_html.difference_update(command["keys"])
 
             for resource in resources:
                 if resource not in self.sent_resources:
@@ -438,7 +845,7 @@ class Session:
                     self.sent_resources.add(resource)
 
             evalid = _current_evalid.get()
-            if evalid is not None:
+            if evalid is not None and "evalid" not in command:
                 command["evalid"] = evalid
 
         await self.socket.send(json.dumps(command))
@@ -451,11 +858,125 @@ class Session:
 
         This queues the command using the session's asyncio loop.
         """
+        if self.print_partial:
+            # An incomplete line is ended by anything that is not printed
+            self.print_str("")
+        if self.print_buffer:
+            # Printed lines must arrive before anything queued after them
+            self.flush_prints()
+        if command.get("command", None) in ("result", "echo"):
+            with self.print_lock:
+                # The next printed lines will start a new log below this
+                self.current_log = None
+        self._queue(command)
+
+    def _queue(self, command):
         if self.socket is None or self.out_queue:
             self.out_queue.append(command)
         else:
             self.schedule(self.send(**command))
 
+    def fill(self, target, html, patch=False, maxtrees=1000):
+        """Replace the contents of the element with id target by html.
+
+        With patch=True, the last HTML sent to each target is kept, and
+        only the differences with it are sent, unless they are larger
+        than the new HTML.
+        """
+        if not patch:
+            self.dom_trees.pop(target, None)
+            self.queue(command="fill", value=html, target=target)
+            return
+
+        text = str(html)
+        tree = parse_html(text)
+        previous = self.dom_trees.pop(target, None)
+        self.dom_trees[target] = (tree, text)
+        while len(self.dom_trees) > maxtrees:
+            self.dom_trees.popitem(last=False)
+
+        if previous is not None:
+            resources = (
+                html.collect_resources() if isinstance(html, Tag) else ()
+            )
+            patch = DOMPatch(diff_trees(previous[0], tree), resources)
+            if not patch.patches:
+                return
+            elif patch.size() < len(text):
+                self.queue(command="patch", patches=patch, target=target)
+                return
+        self.queue(command="fill", value=html, target=target)
+
+    def print_str(self, text, stream=None, end="\n"):
+        """Print a line of text.
+
+        Lines are buffered and sent together as soon as the loop is free,
+        or before the next queued command.
+
+        Arguments:
+            text: The line to print.
+            stream: Where the line comes from, e.g. "stdout" or "stderr".
+            end: Text to print after text. If it does not end with a
+                newline, the rest is held until the line is complete.
+        """
+        if end != "\n" or self.print_partial:
+            with self.print_lock:
+                text = self.print_partial + text + end
+                *lines, self.print_partial = text.split("\n")
+        else:
+            lines = (text,)
+        buffer = self.print_buffer
+        evalid = _current_evalid.get()
+        for line in lines:
+            if len(buffer) == buffer.maxlen:
+                self.print_skipped += 1
+            buffer.append((evalid, stream, line))
+        if lines and not self.print_scheduled and self.socket is not None:
+            self.print_scheduled = True
+            self.loop.call_soon_threadsafe(self.flush_prints)
+
+    def flush_prints(self):
+        # Reset the flag first, so that a line appended while draining the
+        # buffer either gets drained or schedules another flush
+        self.print_scheduled = False
+        with self.print_lock:
+            groups = []
+            while True:
+                try:
+                    evalid, stream, text = self.print_buffer.popleft()
+                except IndexError:
+                    break
+                if not groups or groups[-1][:2] != (evalid, stream):
+                    groups.append((evalid, stream, []))
+                groups[-1][2].append(text)
+            skipped, self.print_skipped = self.print_skipped, 0
+            if skipped:
+                evalid = groups[0][0] if groups else None
+                groups.insert(
+                    0, (evalid, "info", [f"[{skipped} lines skipped]"])
+                )
+            for evalid, stream, lines in groups:
+                log = self.current_log
+                if log is None or log.evalid != evalid:
+                    log = self.new_log(evalid)
+                log.extend(lines)
+                self._queue(
+                    {
+                        "command": "print",
+                        "lines": lines,
+                        "stream": stream,
+                        "evalid": evalid,
+                        "log": log.id,
+                    }
+                )
+
+    def new_log(self, evalid, maxlogs=100):
+        log = PrintLog(f"log{next(_c)}", evalid)
+        self.logs[log.id] = self.current_log = log
+        while len(self.logs) > maxlogs:
+            self.logs.popitem(last=False)
+        return log
+
     def queue_result(self, result, *, type):
         type, html = self.represent(type, result)
         self.tempkeep.append(result)
@@ -1,4 +1,8 @@
+import json
+import math
 import os
+import threading
+from collections import OrderedDict
 from itertools import count
 from types import FunctionType, MethodType
 from typing import Union
@@ -26,6 +30,42 @@ def sktk_hjson(obj):
     return str(_sktk_hjson(obj))
 
 
+def _sktk_json_default(obj):
+    if isinstance(obj, (FunctionType, MethodType)):
+        return {"$$SKTK": callback_registry.register(obj)}
+    raise TypeError(
+        f"Objects of type {type(obj).__name__} cannot be JSON-serialized."
+    )
+
+
+_nonfinite = {"nan": "NaN", "inf": "Infinity", "-inf": "-Infinity"}
+
+
+def _encode_nonfinite(obj):
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return {"$$float": _nonfinite[repr(obj)]}
+    elif isinstance(obj, dict):
+        return {k: _encode_nonfinite(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_encode_nonfinite(x) for x in obj]
+    else:
+        return obj
+
+
+def sktk_json(obj):
+    """Serialize obj to JSON, with functions as {"$$SKTK": callback_id}.
+
+    NaN and infinities are not valid JSON, so they are encoded as
+    {"$$float": "NaN"}, {"$$float": "Infinity"} or {"$$float": "-Infinity"}.
+    """
+    try:
+        return json.dumps(obj, default=_sktk_json_default, allow_nan=False)
+    except ValueError:
+        return json.dumps(
+            _encode_nonfinite(obj), default=_sktk_json_default, allow_nan=False
+        )
+
+
 #############
 # Utilities #
 #############
@@ -134,7 +174,8 @@ def findvar(value, prefix="_"):
 def _default_click(obj, evt):
     if evt.get("shiftKey", False):
         sess = current_session()
-        sess.queue(command="result", value=hrepr(obj), type="print")
+        html = sess.render_cached(obj, lambda: hrepr(obj), namespace="click")
+        sess.queue(command="result", value=html, type="print")
     else:
         pastevar(obj)
 
@@ -146,14 +187,58 @@ def _safe_set(elem, **props):
         return elem(**props)
 
 
+# Click callbacks by id(obj), so that an object that is rendered again, e.g.
+# by a Monitor, keeps the same objid
+_click_ids = OrderedDict()
+_click_lock = threading.Lock()
+
+
+def _click_id(obj, keep=10000):
+    key = id(obj)
+    with _click_lock:
+        method_id = _click_ids.get(key, None)
+        if method_id is not None:
+            try:
+                if callback_registry.resolve(method_id).__self__ is obj:
+                    _click_ids.move_to_end(key)
+                    return method_id
+            except KeyError:
+                pass
+        method_id = callback_registry.register(MethodType(_default_click, obj))
+        _click_ids[key] = method_id
+        _click_ids.move_to_end(key)
+        if len(_click_ids) > keep:
+            _click_ids.popitem(last=False)
+        return method_id
+
+
 def represents(obj, elem, pinnable=False):
     if obj is None:
         return elem
     elif elem.get_attribute("objid", None) is not None:
         return _safe_set(elem, pinnable=pinnable)
     else:
-        method_id = callback_registry.register(MethodType(_default_click, obj))
-        return _safe_set(elem, objid=method_id, pinnable=pinnable)
+        return _safe_set(elem, objid=_click_id(obj), pinnable=pinnable)
+
+
+def lazy(fn, placeholder="...", trigger="visible", **hrepr_options):
+    """Placeholder for content that is only rendered when the client needs it.
+
+    Arguments:
+        fn: Function with no arguments that returns the object to display.
+        placeholder: What to display until the content is loaded.
+        trigger: "visible" to load the content when the placeholder becomes
+            visible, or "click" to load it when it is clicked.
+        hrepr_options: Options to give to hrepr.
+    """
+
+    def load(*_):
+        return hrepr(fn(), **hrepr_options)
+
+    method_id = callback_registry.register(load)
+    return H.div["snek-lazy"](
+        placeholder, lazyid=method_id, lazytrigger=trigger
+    )
 
 
 ##############
@@ -171,17 +256,10 @@ class BaseJSCaller:
         if not self._interactor:
             raise Exception("The JavaScript interface is not active.")
         argtext = ",".join(map(sktk_hjson, args))
-        return f"""
-        require(
-            ['{self._jsid}'],
-            wobj => {{
-                let obj = wobj.deref();
-                if (obj !== null) {{
-                    obj.{method_name}({argtext});
-                }}
-            }}
-        );
-        """
+        return (
+            f"window.snektalk.interactors.call("
+            f"'{self._jsid}', '{method_name}', [{argtext}]);"
+        )
 
 
 class AJSCaller(BaseJSCaller):
@@ -265,40 +343,15 @@ class Interactor:
         return [*reqs, main(export=cls.js_constructor)]
 
     def __hrepr__(self, H, hrepr):
-        params = sktk_hjson(self.parameters)
+        # The client creates the instance from this descriptor, or moves
+        # the existing element if there already is an instance with this id
         self.active = True
-        tmpid = f"$$tmp{next(_count)}"
-        return H.div(
-            H.div(id=tmpid),
-            H.script(
-                f"""
-                (() => {{
-                    let elem = document.getElementById('{tmpid}');
-                    let existing = document.getElementById('{self.jsid}');
-                    if (existing && existing.handler) {{
-                        // Move the existing div
-                        elem.parentElement.replaceChild(
-                            existing, elem
-                        );
-                    }}
-                    else {{
-                        elem.id = '{self.jsid}';
-                        requirejs.undef('{self.jsid}');
-                        define(
-                            '{self.jsid}',
-                            ['{self.js_constructor}'],
-                            ctor => {{
-                                let obj = new ctor(elem, {params});
-                                elem.handler = obj;
-                                return new WeakRef(obj);
-                            }}
-                        );
-                        require(['{self.jsid}'], _ => null);
-                    }}
-                }})();
-                """
-            ),
-        )
+        descriptor = {
+            "id": self.jsid,
+            "ctor": self.js_constructor,
+            "params": self.parameters,
+        }
+        return H.div(interactor=sktk_json(descriptor))
 
 
 ####################
@@ -309,3 +362,22 @@ class Interactor:
 class ReadOnly(Interactor):
     js_constructor = "ReadOnlyEditor"
     js_source = "/scripts/readonly.js"
+
+
+class PagedView(Interactor):
+    """Display a sorted list of keys, rendering the rows in pages.
+
+    The rows for a page are only requested once the page scrolls into
+    view. ``load`` is called with a list of keys and must return HTML
+    with one element per key, each with a ``snek-key`` attribute. The
+    keys can be filtered on the client side.
+    """
+
+    js_constructor = "PagedView"
+    js_source = "/scripts/paged.js"
+
+    def __init__(self, keys, load, pagesize=50):
+        def _load(keys):
+            return hrepr(load(keys))
+
+        super().__init__({"keys": keys, "load": _load, "pagesize": pagesize})
@@ -0,0 +1,41 @@
+import base64
+import struct
+import zlib
+
+import pytest
+
+from snektalk.feat.arrays import array_stats, encode_png, is_ndarray, thumbnail
+
+np = pytest.importorskip("numpy")
+
+
+def test_is_ndarray():
+    assert is_ndarray(np.ndarray)
+    assert is_ndarray(np.matrix)
+    assert not is_ndarray(list)
+
+
+def test_array_stats():
+    stats = array_stats(np.array([1.0, np.nan, 3.0]))
+    assert stats == {"nan": 1, "min": 1.0, "max": 3.0, "mean": 2.0}
+    assert array_stats(np.array(["a"])) == {}
+    assert array_stats(np.array([np.nan])) == {"nan": 1}
+
+
+def test_encode_png():
+    pixels = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    png = encode_png(pixels)
+    assert png.startswith(b"\x89PNG")
+    w, h = struct.unpack(">II", png[16:24])
+    assert (w, h) == (4, 3)
+    idat_len = struct.unpack(">I", png[33:37])[0]
+    raw = zlib.decompress(png[41 : 41 + idat_len])
+    assert raw == b"".join(b"\x00" + bytes(row) for row in pixels)
+
+
+def test_thumbnail():
+    arr = np.random.rand(1000, 500)
+    url = thumbnail(arr, array_stats(arr), size=100)
+    png = base64.b64decode(url.split(",")[1])
+    assert struct.unpack(">II", png[16:24]) == (100, 100)
+    assert thumbnail(np.arange(3), array_stats(np.arange(3))) is None
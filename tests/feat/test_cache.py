@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+from hrepr import H
+
+from snektalk.feat.cache import CachedHTML, RenderCache, version_token
+from snektalk.registry import callback_registry
+from snektalk.utils import sktk_json
+
+
+class _Versioned:
+    def __init__(self):
+        self.version = 0
+
+    def __snek_version__(self):
+        return self.version
+
+
+def test_version_token():
+    assert version_token([1, 2]) == ("len", 2)
+    assert version_token(object()) is None
+    v = _Versioned()
+    t1 = version_token(v)
+    v.version += 1
+    assert version_token(v) != t1
+
+
+def test_render_cache():
+    cache = RenderCache()
+    calls = []
+
+    def render():
+        calls.append(1)
+        return H.div(str(len(xs)))
+
+    xs = [1, 2, 3]
+    h1 = cache.get(xs, render)
+    h2 = cache.get(xs, render)
+    assert isinstance(h1, CachedHTML)
+    assert h1 is h2
+    assert len(calls) == 1
+
+    xs.append(4)
+    h3 = cache.get(xs, render)
+    assert h3 is not h1
+    assert h3.text == "<div>4</div>"
+    assert cache.pop_evicted() == [h1.key]
+    assert cache.get(xs, render, namespace="other") is not h3
+
+
+def test_render_cache_eviction():
+    cache = RenderCache(maxsize=50)
+    objs = [[i] for i in range(3)]
+    htmls = [cache.get(x, lambda: H.div("x" * 10)) for x in objs]
+    assert cache.size <= 50
+    assert cache.pop_evicted() == [htmls[0].key]
+
+
+def test_render_cache_scripts():
+    cache = RenderCache()
+    html = cache.get([1], lambda: H.div(H.script("x")))
+    assert not isinstance(html, CachedHTML)
+    assert not cache.entries
+
+
+def test_render_cache_strong_bounded():
+    cache = RenderCache(maxstrong=2)
+    objs = [[i] for i in range(3)]
+    htmls = [cache.get(x, lambda: H.div("x")) for x in objs]
+    assert cache.nstrong == 2
+    assert cache.pop_evicted() == [htmls[0].key]
+
+    # Objects that can be weakly referenced are not counted
+    v = _Versioned()
+    cache.get(v, lambda: H.div("v"))
+    assert cache.nstrong == 2
+    assert len(cache.entries) == 3
+
+
+class _Callbacks:
+    def click(self):
+        pass
+
+
+def test_render_cache_callbacks():
+    cache = RenderCache()
+    cbs = [_Callbacks()]
+    v = _Versioned()
+
+    def render():
+        click = cbs[0].click
+        return H.div(
+            H.span(onclick=f"$$SKTK({callback_registry.register(click)})"),
+            H.span(data=sktk_json({"f": click})),
+        )
+
+    h1 = cache.get(v, render)
+    assert len(h1.callbacks) == 2
+    assert cache.get(v, render) is h1
+
+    # Re-render once the callbacks are gone from the registry
+    cbs[0] = _Callbacks()
+    h2 = cache.get(v, render)
+    assert h2 is not h1
+    assert cache.pop_evicted() == [h1.key]
+
+
+def test_render_cache_objid():
+    from hrepr import hrepr
+
+    from snektalk.lib import inject
+
+    inject()
+    cache = RenderCache()
+    v = _Versioned()
+    items = [_Callbacks(), 1]
+    h1 = cache.get(v, lambda: hrepr(items))
+    assert len(h1.callbacks) == 3
+    assert h1.resolvable()
+    assert cache.get(v, lambda: hrepr(items)) is h1
+
+    # The click callback of the first item dies with it
+    items[0] = _Callbacks()
+    assert not h1.resolvable()
+    assert cache.get(v, lambda: hrepr(items)) is not h1
+
+
+class _Socket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, data):
+        self.sent.append(json.loads(data))
+
+
+def test_session_sends_reference(tmp_path):
+    from snektalk.session import Session
+
+    sess = Session(history_file=tmp_path / "history", render_cache=True)
+    sess.socket = _Socket()
+    xs = list(range(10))
+    for _ in range(2):
+        _, html = sess.represent("expression", xs)
+        asyncio.run(sess.send(command="result", value=html))
+    first, second = [x for x in sess.socket.sent if x["command"] == "result"]
+    assert first["value"] and first["cache_key"]
+    assert second["value"] is None
+    assert second["cached"] == first["cache_key"]
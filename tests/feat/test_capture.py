@@ -0,0 +1,44 @@
+import os
+import subprocess
+
+from snektalk.feat.capture import FDCapture
+
+
+class _Session:
+    def __init__(self):
+        self.lines = []
+
+    def print_str(self, text, stream=None):
+        self.lines.append((stream, text))
+
+
+def test_fd_capture():
+    sess = _Session()
+    cap = FDCapture(sess).start()
+    try:
+        os.write(1, b"raw stdout\n")
+        os.write(2, b"raw stderr\n")
+        os.write(1, b"progress 1\rprogress 2\n")
+        subprocess.run(["echo", "from subprocess"])
+        os.write(1, b"no newline")
+    finally:
+        cap.stop()
+    assert ("stdout", "raw stdout") in sess.lines
+    assert ("stderr", "raw stderr") in sess.lines
+    assert ("stdout", "progress 2") in sess.lines
+    assert ("stdout", "from subprocess") in sess.lines
+    assert ("stdout", "no newline") in sess.lines
+
+
+def test_fd_capture_skips():
+    sess = _Session()
+    cap = FDCapture(sess, maxlines=3)
+    for i in range(5):
+        cap.feed("stdout", f"{i}\n".encode())
+    cap.flush()
+    assert sess.lines == [
+        ("info", "[2 lines skipped]"),
+        ("stdout", "2"),
+        ("stdout", "3"),
+        ("stdout", "4"),
+    ]
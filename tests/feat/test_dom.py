@@ -0,0 +1,119 @@
+import re
+
+from hrepr import hrepr
+
+from snektalk.feat.dom import diff_trees, parse_html, to_html
+from snektalk.lib import inject
+from snektalk.registry import callback_registry
+from snektalk.session import Session
+
+inject()
+
+
+def _apply(tree, patches):
+    # Python version of applyPatch in repl.js
+    for op, path, arg in patches:
+        parent, node = None, tree
+        for i in path:
+            parent, node = node, node[2][i]
+        if op == "replace":
+            (new,) = parse_html(arg)[2]
+            parent[2][path[-1]] = new
+        elif op == "text":
+            parent[2][path[-1]] = arg
+        elif op == "attrs":
+            for k, v in arg.items():
+                if v is None:
+                    node[1].pop(k, None)
+                else:
+                    node[1][k] = v
+        elif op == "append":
+            node[2].extend(parse_html(arg)[2])
+        elif op == "truncate":
+            del node[2][arg:]
+    return tree
+
+
+def test_parse_html():
+    text = (
+        '<div a="1" b><span>x &amp; y</span><br><script>a && b</script></div>'
+    )
+    tree = parse_html(text)
+    assert tree == [
+        None,
+        {},
+        [
+            [
+                "div",
+                {"a": "1", "b": ""},
+                [
+                    ["span", {}, ["x & y"]],
+                    ["br", {}, []],
+                    ["script", {}, ["a && b"]],
+                ],
+            ]
+        ],
+    ]
+    assert to_html(tree) == text.replace(" b>", ' b="">')
+
+
+def test_parse_table():
+    tree = parse_html("<table><tr><td>1</td></tr></table>")
+    assert tree[2][0][2][0][0] == "tbody"
+
+
+def test_diff_trees():
+    old = parse_html("<ul><li>a</li><li class='x'>b</li><li>c</li></ul>")
+    new = parse_html("<ul><li>a</li><li class='y'>B</li></ul><p>d</p>")
+    patches = diff_trees(old, new)
+    assert ["attrs", [0, 1], {"class": "y"}] in patches
+    assert ["text", [0, 1, 0], "B"] in patches
+    assert ["truncate", [0], 2] in patches
+    assert _apply(old, patches) == new
+
+
+def test_diff_interactor():
+    old = parse_html('<p><div interactor="{&quot;id&quot;: 1}"></div></p>')
+    new = parse_html('<p><div interactor="{&quot;id&quot;: 2}"></div></p>')
+    patches = diff_trees(old, new)
+    assert patches == [["replace", [0, 0], to_html(new[2][0][2][0])]]
+    assert diff_trees(old, old) == []
+
+
+def test_diff_dict():
+    d = {f"key{i}": i for i in range(50)}
+    old = parse_html(str(hrepr(d)))
+    d["key10"] = -1
+    new = parse_html(str(hrepr(d)))
+    patches = diff_trees(old, new)
+    # The text, and the objid of the changed value
+    assert len(patches) == 2
+    assert _apply(old, patches) == new
+
+
+def test_diff_evicted_objid():
+    d = {"a": 1000}
+    old = parse_html(str(hrepr(d)))
+    assert diff_trees(old, parse_html(str(hrepr(d)))) == []
+    # Once the callback of an unchanged value is evicted, the value gets a
+    # new objid, which must be sent
+    for objid in map(int, re.findall(r'objid="(\d+)"', to_html(old))):
+        if callback_registry.resolve(objid).__self__ == 1000:
+            del callback_registry.strong_map[objid]
+    new = parse_html(str(hrepr(d)))
+    patches = diff_trees(old, new)
+    assert [op for op, *_ in patches] == ["attrs"]
+    assert _apply(old, patches) == new
+
+
+def test_session_fill_patch(tmp_path):
+    sess = Session(history_file=tmp_path / "history")
+    d = {f"key{i}": i for i in range(50)}
+    sess.fill("t", hrepr(d), patch=True)
+    sess.fill("t", hrepr(d), patch=True)
+    d["key3"] = 1234
+    sess.fill("t", hrepr(d), patch=True)
+    fill, patch = sess.out_queue
+    assert fill["command"] == "fill"
+    assert patch["command"] == "patch"
+    assert patch["patches"].size() < len(str(fill["value"])) / 20
@@ -19,3 +19,29 @@ def test_merge_deeper():
     assert obj != b
     ed._merge(obj, a, b)
     assert obj == b
+
+
+def _edited():
+    return 1
+
+
+def test_recoder_listener_shared():
+    import gc
+    import weakref
+
+    from jurigged import make_recoder
+
+    recoder = make_recoder(_edited)
+    n = len(recoder.on_status)
+    editors = [ed.SnekRecoder(recoder, _edited) for _ in range(3)]
+    assert len(recoder.on_status) == n + 1
+    statuses = []
+    editors[0].on_status = lambda recoder, status: statuses.append(status)
+    recoder.on_status.emit(recoder, "saved")
+    assert statuses == ["saved"]
+
+    # Editors stay alive so that their callbacks can be resolved
+    ref = weakref.ref(editors.pop())
+    gc.collect()
+    assert ref() is not None
+    assert len(ed._recoder_editors(recoder)) == 3
@@ -0,0 +1,34 @@
+import pytest
+
+from snektalk.feat.grid import Grid, is_dataframe
+
+
+def test_grid_records():
+    records = [{"a": i, "b": str(-i)} for i in range(1000)]
+    records[5]["c"] = float("nan")
+    grid = Grid(records, block=10)
+    assert grid.parameters["columns"] == ["a", "b", "c"]
+    assert grid.parameters["nrows"] == 1000
+    initial = grid.parameters["initial"]
+    assert initial["columns"][0] == list(range(10))
+    assert initial["columns"][2][5] == "nan"
+
+    assert grid.py_query(sort=0, ascending=False, filter="") == 1000
+    assert grid.py_window(0, 2)["columns"][0] == [999, 998]
+    assert grid.py_query(sort=None, ascending=True, filter="99") == 19
+    assert grid.py_window(0, 2)["index"] == [99, 199]
+
+
+def test_grid_dataframe():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+
+    df = pd.DataFrame({"x": np.arange(10_000) % 7, "y": np.arange(10_000.0)})
+    assert is_dataframe(type(df))
+    grid = Grid(df)
+    assert grid.parameters["dtypes"] == ["int64", "float64"]
+    assert len(grid.parameters["initial"]["index"]) == 100
+    grid.py_query(sort=0, ascending=True, filter="")
+    window = grid.py_window(0, 3)
+    assert window["columns"][0] == [0, 0, 0]
+    assert window["index"] == [0, 7, 14]
@@ -0,0 +1,79 @@
+import logging
+
+from snektalk.feat.logs import SnekLogHandler, capture_logs
+
+
+class _Session:
+    pass
+
+
+def _handler(**kwargs):
+    # A long flush interval keeps the records in the pending queue
+    return SnekLogHandler(session=_Session(), flush_interval=1000, **kwargs)
+
+
+def test_log_entries():
+    handler = _handler()
+    logger = logging.getLogger("snektalk.test_logs")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        logger.warning("hello %s", "world")
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("oops")
+    finally:
+        logger.removeHandler(handler)
+    r1, r2 = handler.pending
+    assert r1["message"] == "hello world"
+    assert r1["level"] == "WARNING"
+    assert r1["name"] == "snektalk.test_logs"
+    assert r1["exc"] is None
+    assert r2["level"] == "ERROR"
+    assert isinstance(r2["exc"], int)
+
+
+def test_log_rate_limit():
+    handler = _handler(rate=10, burst=5)
+    for i in range(20):
+        record = logging.LogRecord("a", logging.INFO, "", 0, "x", (), None)
+        record.created = 100.0 + i * 0.001
+        handler.handle(record)
+    record = logging.LogRecord("b", logging.INFO, "", 0, "x", (), None)
+    handler.handle(record)
+    assert len(handler.pending) == 6
+    assert handler.dropped == {"a": 15}
+
+
+def test_log_formatted_on_emit():
+    handler = _handler()
+    args = [1]
+    record = logging.LogRecord("a", logging.INFO, "", 0, "%s", (args,), None)
+    handler.handle(record)
+    args.append(2)
+    assert handler.pending[0]["message"] == "[1]"
+
+
+def test_log_handler_close():
+    sent = []
+    handler = _handler()
+    handler.send_pending = lambda: sent.append(list(handler.pending))
+    handler.handle(logging.LogRecord("a", logging.INFO, "", 0, "x", (), None))
+    handler.close()
+    assert not handler.thread.is_alive()
+    assert len(sent) == 1 and len(sent[0]) == 1
+
+
+def test_capture_logs_idempotent():
+    logger = logging.getLogger("snektalk.test_capture_logs")
+    session = _Session()
+    h1 = capture_logs(logger, session=session, flush_interval=1000)
+    h2 = capture_logs(logger, logging.INFO, session=session)
+    try:
+        assert h1 is h2
+        assert logger.handlers == [h1]
+        assert h1.level == logging.INFO
+    finally:
+        logger.removeHandler(h1)
+        h1.close()
@@ -0,0 +1,44 @@
+import time
+
+from snektalk.feat.pmap import PmapFailure, pmap
+from snektalk.feat.progress import Progress
+
+
+def _inv(x):
+    return 1 / x
+
+
+def test_pmap_ordered():
+    results = list(pmap(_inv, [1, 2, 0, 4], workers=2))
+    assert results[0] == 1
+    assert results[1] == 0.5
+    assert isinstance(results[2], PmapFailure)
+    assert results[2].item == 0
+    assert isinstance(results[2].exception, ZeroDivisionError)
+    assert results[3] == 0.25
+
+
+def test_pmap_as_completed():
+    def f(x):
+        time.sleep(x / 20)
+        return x
+
+    results = list(pmap(f, [3, 1, 2], workers=3, ordered=False))
+    assert results == [1, 2, 3]
+
+
+def test_pmap_process():
+    results = list(pmap(_inv, [1, 2], backend="process"))
+    assert results == [1, 0.5]
+
+
+def test_progress_state():
+    prog = Progress(total=4, mininterval=0)
+    prog.tick()
+    prog.tick(failed=True)
+    state = prog.state()
+    assert state["n"] == 2
+    assert state["failures"] == 1
+    assert state["eta"] is not None
+    prog.close()
+    assert prog.state()["closed"]
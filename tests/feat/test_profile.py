@@ -0,0 +1,121 @@
+import threading
+import time
+
+from snektalk.feat import profile as pf
+
+
+def _inner(n):
+    return sum(range(n))
+
+
+def _outer():
+    _inner(100000)
+    time.sleep(0.01)
+
+
+def test_profile_tree():
+    prof = pf.profile_call(_outer, root=lambda code: code is _outer.__code__)
+    (root,) = prof.tree.children.values()
+    assert root.key is _outer.__code__
+    assert _inner.__code__ in root.children
+    assert root.time >= 0.01
+
+
+def _nested():
+    time.sleep(0.01)
+
+
+def _repl():
+    time.sleep(0.01)
+    _call_nested()
+
+
+def _call_nested():
+    _nested()
+
+
+def test_profile_nested_roots():
+    roots = {_repl.__code__, _nested.__code__}
+    prof = pf.profile_call(_repl, root=lambda code: code in roots)
+    # _nested is only counted under _repl, which calls it indirectly
+    (root,) = prof.tree.children.values()
+    assert root.key is _repl.__code__
+    assert prof.tree.time == root.time
+    nested = root.children[_call_nested.__code__].children[_nested.__code__]
+    assert nested.time >= 0.01
+
+
+def test_profile_export(tmp_path):
+    prof = pf.profile_call(_outer, export_dir=tmp_path)
+    fg = pf.Flamegraph(prof.tree, profile=prof)
+    fg.py_export("pstats")
+    fg.py_export("speedscope")
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert len(files) == 2
+    assert files[0].endswith(".prof")
+    assert files[1].endswith(".speedscope.json")
+
+
+def test_speedscope():
+    tree = pf.CallNode("<root>")
+    tree.add_stack([_outer.__code__, _inner.__code__], 3)
+    tree.add_stack([_outer.__code__], 1)
+    data = pf.speedscope(tree)
+    frames = [f["name"] for f in data["shared"]["frames"]]
+    assert frames == ["_outer", "_inner"]
+    assert data["profiles"][0]["samples"] == [[0], [0, 1]]
+    assert data["profiles"][0]["weights"] == [1, 3]
+
+
+def _busy(stop):
+    while not stop.is_set():
+        _inner(1000)
+
+
+def test_sampler():
+    stop = threading.Event()
+    thread = threading.Thread(target=_busy, args=(stop,))
+    thread.start()
+    sampler = pf.Sampler(interval=0.001)
+    try:
+        sampler.start("busy", thread, session=None)
+        time.sleep(0.2)
+        target = sampler.stop("busy")
+    finally:
+        stop.set()
+        thread.join()
+    assert target.nsamples > 0
+    assert _busy.__code__ in target.tree.children
+    assert target.total_counts[_busy.__code__] == target.nsamples
+
+
+def _second(stop):
+    while not stop.is_set():
+        _inner(1000)
+
+
+def test_sampler_job(tmp_path):
+    from snektalk.session import NamedThreads, Session
+
+    sess = Session(history_file=str(tmp_path / "history.json"))
+    pool = NamedThreads(max_workers=1)
+    stop1, stop2 = threading.Event(), threading.Event()
+    first = pool.run_in_thread(lambda: _busy(stop1), sess, name="first")
+    second = pool.run_in_thread(lambda: _second(stop2), sess, name="second")
+    sampler = pf.Sampler(interval=0.001)
+    try:
+        sampler.start("first", first, session=None)
+        time.sleep(0.1)
+        stop1.set()
+        first.result(timeout=5)
+        # The worker now runs the second job
+        time.sleep(0.1)
+        assert sampler.thread is None
+        target = sampler.stop("first")
+    finally:
+        stop1.set()
+        stop2.set()
+    second.result(timeout=5)
+    assert target.finished
+    assert target.nsamples > 0
+    assert _second.__code__ not in target.total_counts
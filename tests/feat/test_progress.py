@@ -0,0 +1,43 @@
+import time
+
+from snektalk.feat.progress import Progress
+
+
+def test_progress_iter():
+    prog = Progress(range(10), desc="test", mininterval=0)
+    assert len(prog) == 10
+    assert list(prog) == list(range(10))
+    state = prog.state()
+    assert state["n"] == 10
+    assert state["total"] == 10
+    assert state["closed"]
+    assert len(state["history"]) == 10
+
+
+def test_progress_manual():
+    with Progress(total=100, mininterval=0) as prog:
+        prog.update(10)
+        prog.set_description("stage 2")
+        prog.set_postfix(loss=0.5, acc=0.9)
+        prog.update(5)
+    state = prog.state()
+    assert state["n"] == 15
+    assert state["desc"] == "stage 2"
+    assert state["postfix"] == "loss=0.5, acc=0.9"
+    assert state["closed"]
+    prog.reset(total=50)
+    assert prog.state()["n"] == 0
+    assert prog.state()["total"] == 50
+
+
+def test_progress_throttle(monkeypatch):
+    # Fake clock that advances by a quarter of a second at each reading
+    clock = iter(range(1_000_000))
+    monkeypatch.setattr(time, "monotonic", lambda: next(clock) / 4)
+    prog = Progress(range(100), mininterval=1)
+    refreshes = []
+    prog.refresh = lambda: refreshes.append(prog.n)
+    assert list(prog) == list(range(100))
+    # One refresh every four iterations, plus one on close
+    assert refreshes == [*range(4, 101, 4), 100]
+    assert prog.history[-1] == 0.25
@@ -0,0 +1,81 @@
+import os
+import re
+import threading
+import time
+
+from snektalk.feat.shell import run_shell
+from snektalk.session import Session, SnektalkInterrupt, kill_thread
+
+
+def _inserts(sess):
+    return "".join(
+        str(cmd["value"])
+        for cmd in sess.out_queue
+        if cmd["command"] == "insert"
+    )
+
+
+def _alive(pid):
+    # Orphaned zombies may not be reaped in containers, they count as dead
+    if not os.path.isdir("/proc"):
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def test_run_shell(tmp_path):
+    sess = Session(history_file=str(tmp_path / "history.json"))
+    rc = run_shell("echo hello; echo oops >&2; exit 3", sess)
+    assert rc == 3
+    out = _inserts(sess)
+    assert '<div class="snek-shellstdout">hello</div>' in out
+    assert '<div class="snek-shellstderr">oops</div>' in out
+    assert "[exit status 3]" in out
+
+
+def test_run_shell_interrupt(tmp_path):
+    sess = Session(history_file=str(tmp_path / "history.json"))
+    errors = []
+
+    def run():
+        try:
+            run_shell("sleep 30 & echo $!; wait", sess)
+        except SnektalkInterrupt as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=run)
+    t0 = time.time()
+    thread.start()
+    time.sleep(0.3)
+    kill_thread(thread, SnektalkInterrupt)
+    thread.join()
+    assert time.time() - t0 < 5
+    assert errors
+    assert "[terminated]" in _inserts(sess)
+
+    # The child of the shell is terminated as well
+    (pid,) = re.findall(r"stdout\">(\d+)<", _inserts(sess))
+    for _ in range(100):
+        if not _alive(int(pid)):
+            break
+        time.sleep(0.01)
+    else:
+        raise AssertionError("sleep was not terminated")
+
+
+def test_shell_stream_line_bounded(tmp_path):
+    from snektalk.feat.shell import ShellStream
+
+    sess = Session(history_file=str(tmp_path / "history.json"))
+    out = ShellStream(sess, maxlines=2)
+    for i in range(5):
+        out.line(str(i))
+    out.flush()
+    assert "[3 lines skipped]" in _inserts(sess)
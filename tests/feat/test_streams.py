@@ -0,0 +1,72 @@
+import io
+import itertools
+
+from hrepr import hrepr
+
+from snektalk.feat.streams import Stream, is_stream
+from snektalk.lib import inject
+
+inject()
+
+
+def _naturals():
+    yield from itertools.count()
+
+
+async def _agen(n):
+    for i in range(n):
+        yield i
+
+
+def test_is_stream():
+    assert is_stream(type(_naturals()))
+    assert is_stream(type(iter([])))
+    assert is_stream(type(_agen(1)))
+    assert not is_stream(list)
+    assert not is_stream(io.StringIO)
+
+
+def test_pull():
+    s = Stream(_naturals(), pagesize=5)
+    assert s.pull(3) == (0, [0, 1, 2])
+    assert s.pull(3) == (3, [3, 4, 5])
+    assert not s.done
+
+
+def test_pull_async():
+    s = Stream(_agen(5))
+    assert s.pull(3) == (0, [0, 1, 2])
+    assert s.pull(3) == (3, [3, 4])
+    assert s.done
+
+
+def test_pull_error():
+    def gen():
+        yield 1
+        raise ValueError("oops")
+
+    s = Stream(gen())
+    assert s.pull(10) == (0, [1])
+    assert s.done
+    assert isinstance(s.error, ValueError)
+
+
+def test_hrepr_generator():
+    gen = _naturals()
+    html = str(hrepr(gen))
+    assert "snek-stream" in html
+    assert "next 20" in html
+    # Only the first page is pulled
+    assert next(gen) == 20
+
+
+def test_render_oversize_stream(tmp_path):
+    from snektalk.session import Session
+
+    sess = Session(history_file=tmp_path / "history")
+    sess.render_budget["max_bytes"] = 100
+    gen = _naturals()
+    _, html = sess.represent("expression", gen)
+    assert "snek-stream" in str(html)
+    # Not rendered a second time, which would pull another page
+    assert next(gen) == 20
@@ -0,0 +1,157 @@
+import io
+import os
+import timeit
+
+import pytest
+
+from snektalk.lib import inject, orig_print, snekprint_override
+from snektalk.session import Session, new_evalid
+
+inject()
+
+
+def test_print_batches_lines(tmp_path):
+    sess = Session(history_file=tmp_path / "history")
+    with sess.set_context():
+        with new_evalid():
+            snekprint_override("a", "b")
+            snekprint_override("c", "d", sep="-")
+        snekprint_override([1, 2])
+    print_cmd, result_cmd = sess.out_queue
+    assert print_cmd["command"] == "print"
+    assert print_cmd["lines"] == ["a b", "c-d"]
+    assert print_cmd["evalid"] is not None
+    assert result_cmd["command"] == "result"
+
+
+def test_print_from_hrepr(tmp_path, capsys):
+    class Printer:
+        def __hrepr__(self, H, hrepr):
+            print(self)
+            print("a string")
+            return H.span("printer")
+
+    sess = Session(history_file=tmp_path / "history")
+    with sess.set_context():
+        snekprint_override(Printer())
+    out = capsys.readouterr().out
+    assert "Printer" in out
+    assert "a string" in out
+    (cmd,) = sess.out_queue
+    assert "printer" in str(cmd["value"])
+
+
+def test_print_fast_path(tmp_path, monkeypatch):
+    # Strings are buffered without going through hrepr, and coalesced into
+    # a single print command
+    from snektalk import lib
+
+    def no_hrepr(*args, **kwargs):
+        raise AssertionError("hrepr should not be called")
+
+    monkeypatch.setattr(lib, "hrepr", no_hrepr)
+    sess = Session(history_file=tmp_path / "history")
+    with sess.set_context():
+        for i in range(1000):
+            snekprint_override("hello", str(i))
+    assert len(sess.print_buffer) == 1000
+    sess.flush_prints()
+    (cmd,) = sess.out_queue
+    assert len(cmd["lines"]) == 1000
+    assert cmd["lines"][-1] == "hello 999"
+
+
+@pytest.mark.skipif(
+    "CI" in os.environ, reason="timings are unreliable on loaded machines"
+)
+def test_print_overhead(tmp_path):
+    # Printing a string in snektalk should not cost much more than
+    # printing it to a file with the original print. The budget is loose so
+    # that the test does not fail because of noise.
+    f = io.StringIO()
+    n = 10000
+    base = min(
+        timeit.repeat(lambda: orig_print("hello", file=f), number=n, repeat=5)
+    )
+    sess = Session(history_file=tmp_path / "history")
+    with sess.set_context():
+        ours = min(
+            timeit.repeat(
+                lambda: snekprint_override("hello"), number=n, repeat=5
+            )
+        )
+    assert len(sess.print_buffer) + sess.print_skipped == 5 * n
+    assert ours < 8 * base
+
+
+def test_print_end(tmp_path):
+    sess = Session(history_file=tmp_path / "history")
+    with sess.set_context():
+        snekprint_override("a", end="")
+        snekprint_override("b", end="!\nc")
+        snekprint_override("d")
+        snekprint_override("e", end="")
+        sess.queue(command="result", value="x", type="print")
+    (p1,) = [cmd for cmd in sess.out_queue if cmd["command"] == "print"]
+    assert p1["lines"] == ["ab!", "cd", "e"]
+
+
+def test_print_from_render_thread(tmp_path, capsys):
+    class Printer:
+        def __hrepr__(self, H, hrepr):
+            print("inside")
+            return H.span("printer")
+
+    sess = Session(history_file=tmp_path / "history")
+    with sess.set_context():
+        _, html = sess.represent("expression", Printer())
+    assert "inside" in capsys.readouterr().out
+    assert not sess.print_buffer
+
+
+def test_print_logs(tmp_path):
+    sess = Session(history_file=tmp_path / "history")
+    with sess.set_context():
+        for i in range(3):
+            snekprint_override(f"line {i}")
+        sess.flush_prints()
+        snekprint_override("line 3")
+        snekprint_override([1])
+        snekprint_override("line 4")
+        sess.flush_prints()
+    p1, p2, _, p3 = sess.out_queue
+    assert p1["log"] == p2["log"] != p3["log"]
+    assert sess.lib.method_search_log(p1["log"], "LINE") == [
+        [1, "line 0"],
+        [2, "line 1"],
+        [3, "line 2"],
+        [4, "line 3"],
+    ]
+    assert sess.lib.method_search_log(p3["log"], "4") == [[1, "line 4"]]
+    assert sess.lib.method_search_log("nope", "4") == []
+
+
+def test_print_logs_merge_across_updates(tmp_path):
+    sess = Session(history_file=tmp_path / "history")
+    with sess.set_context():
+        snekprint_override("line 0")
+        sess.queue(command="eval", value="null")
+        sess.queue(command="fill", value="x", target="elsewhere")
+        snekprint_override("line 1")
+        sess.flush_prints()
+    logs = {cmd["log"] for cmd in sess.out_queue if cmd["command"] == "print"}
+    assert len(logs) == 1
+
+
+def test_print_buffer_bounded(tmp_path):
+    from collections import deque
+
+    sess = Session(history_file=tmp_path / "history")
+    sess.print_buffer = deque(maxlen=3)
+    for i in range(5):
+        sess.print_str(f"line {i}")
+    sess.flush_prints()
+    skipped, lines = sess.out_queue
+    assert skipped["stream"] == "info"
+    assert skipped["lines"] == ["[2 lines skipped]"]
+    assert lines["lines"] == ["line 2", "line 3", "line 4"]
@@ -0,0 +1,260 @@
+import json
+import re
+import time
+from html import unescape
+
+from hrepr import hrepr
+
+from snektalk.lib import inject
+from snektalk.registry import callback_registry
+
+inject()
+
+
+def _recurse(n):
+    if n == 0:
+        raise ValueError("bottom")
+    return _recurse(n - 1)
+
+
+def _get_exception(n):
+    try:
+        _recurse(n)
+    except ValueError as exc:
+        return exc
+
+
+def test_lazy_traceback():
+    exc = _get_exception(50)
+    html = str(hrepr(exc))
+    assert "LiveEditor" not in html
+    ids = re.findall(r'lazyid="(\d+)"', html)
+    assert len(ids) > 50
+    frame = callback_registry.resolve(int(ids[-1]))()
+    assert "LiveEditor" in str(frame)
+
+
+def test_frame_cache():
+    from jurigged import registry
+    from jurigged.codetools import UpdateOperation
+
+    from snektalk.repr import frame_cache
+
+    code = _recurse.__code__
+    info = frame_cache.get(code)
+    assert frame_cache.get(code) is info
+    assert info.recoder is not None
+    assert info.recoder is frame_cache.get(code).recoder
+
+    cf, defn = registry.find(code)
+    registry.activity.emit(UpdateOperation(cf, defn))
+    assert frame_cache.get(code) is not info
+
+
+def test_module_pages():
+    import json as module
+
+    html = str(hrepr(module))
+    assert "dumps" in html
+    assert "snek-module-member" not in html
+    load_id = re.findall(r"SKTK&quot;: (\d+)", html)[0]
+    page = str(callback_registry.resolve(int(load_id))(["dumps", "nope"]))
+    assert 'snek-key="dumps"' in page
+    assert "nope" not in page
+
+
+def test_interactor_descriptor():
+    from snektalk.utils import PagedView
+
+    view = PagedView(["a", "b"], load=lambda keys: keys)
+    html = str(hrepr(view))
+    assert "<script" not in html
+    (descr,) = re.findall(r'interactor="([^"]*)"', html)
+    descr = json.loads(unescape(descr))
+    assert descr["id"] == view.jsid
+    assert descr["ctor"] == "PagedView"
+    assert descr["params"]["keys"] == ["a", "b"]
+    load = callback_registry.resolve(descr["params"]["load"]["$$SKTK"])
+    assert "<" in str(load(["a"]))
+    assert f"'{view.jsid}', 'update'" in view.js._getcode("update", [1])
+
+
+def test_sktk_json_nonfinite():
+    from snektalk.utils import sktk_json
+
+    nan, inf = float("nan"), float("inf")
+    data = json.loads(sktk_json({"a": [1.0, nan, (-inf,)], "b": inf}))
+    assert data == {
+        "a": [1.0, {"$$float": "NaN"}, [{"$$float": "-Infinity"}]],
+        "b": {"$$float": "Infinity"},
+    }
+    assert sktk_json([1.5]) == "[1.5]"
+
+
+class _Base:
+    def f(self):
+        pass
+
+    def g(self):
+        pass
+
+
+class _Derived(_Base):
+    x = 1
+
+    def g(self):
+        pass
+
+
+def test_class_members():
+    from snektalk.repr import InheritedMembers, class_cache
+
+    html = str(hrepr(_Derived))
+    assert "inherited from" in html
+    assert "1 member<" in html
+
+    rows = class_cache.rows(_Derived, None)
+    assert [name for name, _ in rows] == ["g", "x"]
+
+    _Derived.y = 2
+    try:
+        assert "y" in str(hrepr(_Derived))
+    finally:
+        del _Derived.y
+
+    inherited = str(hrepr(InheritedMembers(_Base, frozenset({"g"}))))
+    assert ">f<" in inherited
+    assert ">g<" not in inherited
+
+
+def test_class_members_evicted():
+    from snektalk.repr import class_cache
+
+    str(hrepr(_Derived))
+    rows = class_cache.rows(_Derived, None)
+    assert class_cache.rows(_Derived, None) is rows
+    # The click callback of x = 1 is held strongly, until it is evicted
+    (x,) = [cells for name, cells in rows if name == "x"]
+    objid = int(re.search(r'objid="(\d+)"', str(x[1])).group(1))
+    del callback_registry.strong_map[objid]
+    str(hrepr(_Derived))
+    assert class_cache.rows(_Derived, None) is not rows
+
+
+def test_render_budget():
+    big = list(range(10_000_000))
+    html = str(hrepr(big, max_nodes=50))
+    assert "9999950 more" in html
+
+    nested = {i: list(range(100)) for i in range(100)}
+    html = str(hrepr(nested, max_nodes=500))
+    load_id = re.findall(r'lazyid="(\d+)"', html)[-1]
+    page = str(callback_registry.resolve(int(load_id))())
+    assert "snek-more-page" in page
+
+
+def test_session_render_budget(tmp_path):
+    from snektalk.session import Session
+
+    sess = Session(history_file=tmp_path / "history")
+    sess.render_budget["max_bytes"] = 1000
+    _, html = sess.represent("expression", list(range(1000)))
+    assert len(str(html)) <= 1000
+    sess.render_budget["max_bytes"] = 10
+    _, html = sess.represent("expression", list(range(1000)))
+    assert "too large" in str(html)
+
+
+class _Slow:
+    def __hrepr__(self, H, hrepr):
+        time.sleep(0.5)
+        return H.span("slow")
+
+
+def test_render_timeout(tmp_path):
+    from snektalk.session import Session
+
+    sess = Session(history_file=tmp_path / "history")
+    sess.render_budget["timeout"] = 0.05
+    t0 = time.time()
+    _, html = sess.represent("expression", _Slow())
+    assert "render anyway" in str(html)
+    assert _Slow in sess.slow_types
+    _, html = sess.represent("expression", _Slow())
+    assert "render anyway" in str(html)
+    assert time.time() - t0 < 0.4
+
+
+def test_render_timeout_culprit(tmp_path):
+    from snektalk.session import Session
+
+    sess = Session(history_file=tmp_path / "history")
+    sess.render_budget["timeout"] = 0.05
+    _, html = sess.represent("expression", [1, _Slow()])
+    assert "render anyway" in str(html)
+    # Only the type that was slow is remembered, not the list
+    assert sess.slow_types == {_Slow}
+    _, html = sess.represent("expression", [1, 2, 3])
+    assert "render anyway" not in str(html)
+
+
+def test_render_stream_no_timeout(tmp_path):
+    from snektalk.session import Session
+
+    def gen():
+        for i in range(3):
+            time.sleep(0.03)
+            yield i
+
+    sess = Session(history_file=tmp_path / "history")
+    sess.render_budget["timeout"] = 0.05
+    it = gen()
+    _, html = sess.represent("expression", it)
+    assert "render anyway" not in str(html)
+    assert not sess.slow_types
+
+
+class _Expensive:
+    x = 1
+
+    def __init__(self):
+        self.y = [1, 2]
+        self.calls = 0
+
+    @property
+    def prop(self):
+        self.calls += 1
+        return 3
+
+    @property
+    def slow(self):
+        time.sleep(1)
+
+    def method(self):
+        pass
+
+
+def test_hdir_is_lazy():
+    from snektalk.lib import HDir, attribute_kind
+
+    obj = _Expensive()
+    html = str(hrepr(HDir(obj)))
+    assert obj.calls == 0
+    assert "prop" in html
+    assert attribute_kind(obj, "prop") == "property"
+    assert attribute_kind(obj, "method") == "method"
+    assert attribute_kind(obj, "x") == "int"
+    assert attribute_kind(obj, "y") == "list"
+
+    hdir = HDir(obj, timeout=0.05)
+    assert "3" in str(hdir.value("prop"))
+    assert obj.calls == 1
+    assert "timed out" in str(hdir.value("slow"))
+
+    # One callback for the whole listing, which takes the attribute name
+    html = str(hrepr(hdir))
+    ids = set(re.findall(r'lazyid="(\d+)"', html))
+    assert len(ids) == 1
+    assert 'lazyarg="prop"' in html
+    load = callback_registry.resolve(int(ids.pop()))
+    assert "3" in str(load("prop"))
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from snektalk.session import NamedThreads, Session
+
+
+@pytest.fixture
+def sess(tmp_path):
+    return Session(history_file=str(tmp_path / "history.json"))
+
+
+def test_pool_limit(sess):
+    pool = NamedThreads(max_workers=2)
+    gate = threading.Event()
+    jobs = [
+        pool.run_in_thread(lambda i=i: gate.wait() and i, sess)
+        for i in range(4)
+    ]
+    assert len(pool.workers) == 2
+    assert [job.status for job in jobs[2:]] == ["queued", "queued"]
+    gate.set()
+    assert [job.result(timeout=5) for job in jobs] == [0, 1, 2, 3]
+    assert all(job.status == "done" for job in jobs)
+    assert len(pool.workers) == 2
+
+
+def test_job_failure_and_cancel(sess):
+    pool = NamedThreads(max_workers=1)
+    gate = threading.Event()
+    blocker = pool.run_in_thread(gate.wait, sess, name="blocker")
+    failing = pool.run_in_thread(lambda: 1 / 0, sess)
+    cancelled = pool.run_in_thread(lambda: 1, sess)
+    cancelled.kill()
+    assert cancelled.status == "cancelled"
+    gate.set()
+    assert blocker.result(timeout=5) is True
+    assert isinstance(failing.exception(timeout=5), ZeroDivisionError)
+    with pytest.raises(ZeroDivisionError):
+        failing.result()
+    assert failing.status == "failed"
+
+
+def test_job_killed_while_starting(sess):
+    from snektalk.session import ThreadKilledException
+
+    pool = NamedThreads(max_workers=1)
+    queue_result = sess.queue_result
+
+    def killed_on_start(value, **kwargs):
+        if "Starting" in str(value):
+            raise ThreadKilledException()
+        return queue_result(value, **kwargs)
+
+    sess.queue_result = killed_on_start
+    job = pool.run_in_thread(lambda: 1, sess, name="early")
+    job.exception(timeout=5)
+    assert job.status == "killed"
+    assert "early" not in pool.threads
+    sess.queue_result = queue_result
+    assert pool.run_in_thread(lambda: 2, sess, name="early").result(5) == 2
+
+
+def test_pool_idle_worker_not_shared(sess):
+    pool = NamedThreads(max_workers=4)
+    pool.run_in_thread(lambda: 1, sess).result(timeout=5)
+    while not pool.idle:
+        time.sleep(0.001)
+    gate = threading.Event()
+    long = pool.run_in_thread(gate.wait, sess)
+    quick = pool.run_in_thread(lambda: 2, sess)
+    # The idle worker can only take one of the jobs
+    assert len(pool.workers) == 2
+    assert quick.result(timeout=5) == 2
+    gate.set()
+    assert long.result(timeout=5) is True